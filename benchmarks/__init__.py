@@ -0,0 +1 @@
+# Offline benchmark suite for the data and model pipeline (python -m benchmarks).
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+
+from benchmarks.suite import (
+    DEFAULT_THRESHOLD, compare, load_results, run_suite, save_results, updated_baseline,
+)
+from benchmarks.synthetic import SCALES
+from core.forecast import METHODS
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# ---------------- Command line ----------------
+#     python -m benchmarks                          # small scale, compare to baseline.json
+#     python -m benchmarks --scale small medium     # several scales
+#     python -m benchmarks --update-baseline        # record this machine's timings
+# Exits with status 1 when a benchmark regressed.
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the data and model pipeline on synthetic IMF-shaped panels.")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["small"])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (median is kept)")
+    parser.add_argument("--forecast-series", type=int, default=20, help="series forecast per method")
+    parser.add_argument("--method", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--skip-load", action="store_true", help="skip writing and parsing the Excel/CSV sources")
+    parser.add_argument("--output", default="benchmarks/results.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument("--update-baseline", action="store_true", help="write these results into the baseline")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.scale, args.repeat, args.forecast_series, args.method, args.skip_load)
+    save_results(report, args.output)
+    print(f"\nResults written to {args.output}")
+
+    baseline = load_results(args.baseline) if os.path.exists(args.baseline) else None
+    if args.update_baseline:
+        save_results(updated_baseline(report, baseline), args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    if baseline.get("environment", {}).get("cpu_count") != report["environment"]["cpu_count"] \
+            or baseline.get("environment", {}).get("machine") != report["environment"]["machine"]:
+        print("Note: the baseline was recorded on a different machine; timings may not be comparable.")
+
+    rows = compare(report, baseline, args.threshold)
+    print(f"\n{'scale':<8} {'benchmark':<32} {'baseline':>12} {'current':>12} {'ratio':>7}  status")
+    for scale, name, base, now, ratio, status in rows:
+        base_text = f"{base * 1000:10.2f}ms" if base is not None else f"{'-':>12}"
+        ratio_text = f"{ratio:6.2f}x" if ratio is not None else f"{'-':>7}"
+        print(f"{scale:<8} {name:<32} {base_text} {now * 1000:10.2f}ms {ratio_text}  {status}")
+
+    regressions = [row for row in rows if row[5] == "REGRESSION"]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than the threshold.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
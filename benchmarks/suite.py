@@ -0,0 +1,167 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import SCALES, make_next_vintage, make_scale, write_sources
+from core.closed_form import linear_forecast, moving_average_forecast
+from core.convert import convert_nfa_to_usd
+from core.forecast import MAX_HORIZON, METHODS, forecast_series
+from core.ingest import clean_panels, fill_rows, parse_fx, parse_nfa, update_panels
+from core.risk import compute_risk_metrics
+
+RESULTS_FORMAT = 1
+DEFAULT_THRESHOLD = 0.25 # Slowdown (as a fraction of the baseline) reported as a regression
+MIN_DELTA_SECONDS = 0.005 # Differences below this are timer noise, never regressions
+
+
+# ---------------- Timing ----------------
+# Median of `repeat` runs. `warmup` runs once untimed first, so one-off costs
+# (first imports of a model library) do not count.
+def time_call(fn, repeat=3, warmup=False):
+    if warmup:
+        fn()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {"seconds": statistics.median(runs), "min": min(runs), "runs": repeat}
+
+
+def environment():
+    import pandas as pd
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# ---------------- Suite ----------------
+# Times every pipeline stage on one synthetic scale:
+#   load               parse the IMF-layout workbook and CSV
+#   fill               gap filling of the raw NFA and FX panels
+#   convert            NFA -> USD conversion
+#   clean              full cleaning (fill, convert, fill USD)
+#   update             incremental cleaning of the next vintage (checked against a full clean)
+#   risk_metrics       cross-country risk table of the USD panel
+#   forecast/<method>  forecast_series on `forecast_series_count` USD series
+#   forecast/closed_form  batched Linear Regression + Moving Average (every window) on all USD series
+# Returns {benchmark name: timing}.
+def run_scale(scale, repeat=3, forecast_series_count=20, methods=METHODS, skip_load=False, log=print):
+    raw_nfa, raw_fx = make_scale(scale)
+    results = {}
+
+    def record(name, fn, warmup=False):
+        results[name] = time_call(fn, repeat, warmup)
+        log(f"  {name:<32} {results[name]['seconds'] * 1000:10.2f} ms")
+
+    if not skip_load:
+        with tempfile.TemporaryDirectory() as directory:
+            nfa_path, fx_path = write_sources(raw_nfa, raw_fx, directory)
+            record("load", lambda: (parse_nfa(nfa_path), parse_fx(fx_path)))
+
+    record("fill", lambda: (fill_rows(raw_nfa), fill_rows(raw_fx)))
+    df_nfa, df_fx = fill_rows(raw_nfa), fill_rows(raw_fx)
+    record("convert", lambda: convert_nfa_to_usd(df_nfa, df_fx))
+    record("clean", lambda: clean_panels(raw_nfa, raw_fx))
+    df_usd = clean_panels(raw_nfa, raw_fx)[2]
+    next_nfa, next_fx = make_next_vintage(raw_nfa, raw_fx)
+    previous = (*clean_panels(raw_nfa, raw_fx)[:3], raw_nfa, raw_fx)
+    check_update(previous, next_nfa, next_fx)
+    record("update", lambda: update_panels(previous, next_nfa, next_fx))
+    record("risk_metrics", lambda: compute_risk_metrics(df_usd))
+
+    years = np.array([int(y) for y in df_usd.columns[1:]])
+    sample = df_usd.iloc[:forecast_series_count, 1:].to_numpy(dtype=float)
+    for method in methods:
+        record(f"forecast/{method}",
+               lambda method=method: [forecast_series(years, row, method, MAX_HORIZON, n_jobs=1) for row in sample],
+               warmup=True)
+    panel_values = df_usd.iloc[:, 1:].to_numpy(dtype=float)
+    record("forecast/closed_form",
+           lambda: (linear_forecast(years, panel_values, MAX_HORIZON), moving_average_forecast(years, panel_values, MAX_HORIZON)),
+           warmup=True)
+    return results
+
+
+# The incremental update must give the panels a full clean gives (rows added,
+# revised and removed included); raises AssertionError otherwise
+def check_update(previous, raw_nfa, raw_fx):
+    import pandas as pd
+    updated = update_panels(previous, raw_nfa, raw_fx)
+    assert updated is not None, "incremental update refused"
+    for name, got, expected in zip(("NFA", "FX", "USD"), updated[:3], clean_panels(raw_nfa, raw_fx)[:3]):
+        try:
+            pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+        except AssertionError as e:
+            raise AssertionError(f"incremental {name} panel differs from a full clean: {e}") from None
+
+
+def run_suite(scales=("small",), repeat=3, forecast_series_count=20, methods=METHODS, skip_load=False, log=print):
+    report = {"format": RESULTS_FORMAT, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "environment": environment(), "forecast_series": forecast_series_count, "scales": {}}
+    for scale in scales:
+        n_countries, n_years = SCALES[scale]
+        log(f"{scale}: {n_countries} series x {n_years} years")
+        report["scales"][scale] = run_scale(scale, repeat, forecast_series_count, methods, skip_load, log)
+    return report
+
+
+# ---------------- Results files and baseline comparison ----------------
+def save_results(report, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Compares every benchmark present in both reports. A benchmark regresses when it
+# is more than its threshold slower than the baseline (and slower by more than
+# MIN_DELTA_SECONDS). Per-benchmark thresholds can be set in the baseline file
+# under "thresholds" ({"forecast/XGBoost": 0.5}); others use `threshold`.
+# Returns a list of (scale, name, baseline s, current s, ratio, status) rows.
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    overrides = baseline.get("thresholds", {})
+    rows = []
+    for scale, current in report["scales"].items():
+        reference = baseline.get("scales", {}).get(scale, {})
+        for name, timing in current.items():
+            if name not in reference:
+                rows.append((scale, name, None, timing["seconds"], None, "new"))
+                continue
+            base, now = reference[name]["seconds"], timing["seconds"]
+            ratio = now / base if base > 0 else float("inf")
+            limit = overrides.get(name, threshold)
+            if ratio > 1 + limit and now - base > MIN_DELTA_SECONDS:
+                status = "REGRESSION"
+            elif ratio < 1 / (1 + limit) and base - now > MIN_DELTA_SECONDS:
+                status = "faster"
+            else:
+                status = "ok"
+            rows.append((scale, name, base, now, ratio, status))
+    return rows
+
+
+# Baseline with the scales of `report` replaced; other scales and thresholds are kept
+def updated_baseline(report, baseline=None):
+    merged = dict(report)
+    merged["scales"] = {**(baseline or {}).get("scales", {}), **report["scales"]}
+    if baseline and "thresholds" in baseline:
+        merged["thresholds"] = baseline["thresholds"]
+    return merged
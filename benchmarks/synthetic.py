@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# ---------------- Synthetic IMF-shaped panels ----------------
+# Raw NFA and FX frames shaped like the parsed IMF inputs (a Country column
+# followed by one column per year), with the same kinds of gaps the real data
+# has: scattered missing years, countries with no data at all, NFA countries
+# without an FX series and FX-only countries. Everything derives from `seed`,
+# so a scale always produces the same panels.
+
+SCALES = {
+    # name: (countries / series, years)
+    "small": (200, 10), # Same size as the current IMF release
+    "medium": (2_000, 30),
+    "large": (10_000, 60),
+    "xlarge": (50_000, 100),
+}
+
+
+def make_raw_panels(n_countries, n_years, start_year=2015, missing_rate=0.1, empty_rate=0.02,
+                    fx_coverage=0.85, seed=0):
+    rng = np.random.default_rng(seed)
+    years = [str(start_year + i) for i in range(n_years)]
+    countries = np.array([f"Country {i:05d}" for i in range(n_countries)])
+
+    # NFA: random walks around a country-specific level, sign changes included
+    level = rng.lognormal(mean=10, sigma=2, size=(n_countries, 1)) * rng.choice([1, 1, 1, -1], size=(n_countries, 1))
+    steps = rng.normal(0.02, 0.15, size=(n_countries, n_years))
+    nfa = level * np.cumprod(1 + steps, axis=1)
+    nfa[rng.random(nfa.shape) < missing_rate] = np.nan
+    nfa[rng.random(n_countries) < empty_rate] = np.nan
+
+    # FX: positive rates drifting slowly, for part of the NFA countries plus a few extra ones
+    has_fx = rng.random(n_countries) < fx_coverage
+    n_extra = max(1, n_countries // 20)
+    fx_countries = np.concatenate([countries[has_fx], [f"FX only {i:05d}" for i in range(n_extra)]])
+    fx_level = rng.lognormal(mean=1, sigma=2, size=(len(fx_countries), 1))
+    fx = fx_level * np.exp(np.cumsum(rng.normal(0.01, 0.05, size=(len(fx_countries), n_years)), axis=1))
+    fx[rng.random(fx.shape) < missing_rate / 2] = np.nan
+
+    raw_nfa = pd.DataFrame(nfa, columns=years)
+    raw_nfa.insert(0, "Country", countries)
+    raw_fx = pd.DataFrame(fx, columns=years)
+    raw_fx.insert(0, "Country", fx_countries)
+    raw_fx = raw_fx.sort_values(by="Country").reset_index(drop=True)
+    return raw_nfa, raw_fx
+
+
+def make_scale(scale, seed=0):
+    n_countries, n_years = SCALES[scale]
+    return make_raw_panels(n_countries, n_years, seed=seed)
+
+
+# The next IMF vintage of a raw pair: a share of the NFA and FX rows revised,
+# the first FX country and the last NFA country dropped, and one new NFA country
+def make_next_vintage(raw_nfa, raw_fx, revised_rate=0.05, seed=1):
+    rng = np.random.default_rng(seed)
+    nfa, fx = raw_nfa.copy(), raw_fx.copy()
+    for df in (nfa, fx):
+        revised = rng.random(len(df)) < revised_rate
+        df.loc[revised, df.columns[1:]] = df.loc[revised, df.columns[1:]].to_numpy() * 1.01
+    fx = fx.iloc[1:].reset_index(drop=True)
+    added = nfa.iloc[[0]].assign(Country="New country")
+    nfa = pd.concat([nfa.iloc[:-1], added], ignore_index=True)
+    return nfa, fx
+
+
+# ---------------- Source files ----------------
+# Writes the raw frames in the layout of the IMF downloads (the IFS workbook with
+# its 6 title rows, the WEO CSV with its metadata columns), so the benchmark of
+# loading goes through the same parsers as the app. Returns (nfa_path, fx_path).
+def write_sources(raw_nfa, raw_fx, directory):
+    os.makedirs(directory, exist_ok=True)
+    nfa_path = os.path.join(directory, "Monetary_Sector_Depository_Corporat_synthetic.xlsx")
+    fx_path = os.path.join(directory, "dataset_synthetic_IMF.RES_WEO_6.0.0.csv")
+    year_cols = list(raw_nfa.columns[1:])
+
+    sheet = raw_nfa.rename(columns={y: float(y) for y in year_cols})
+    sheet.insert(1, "Scale", "Millions")
+    sheet.insert(2, "Base Year", np.nan)
+    title = pd.DataFrame([["Monetary and Financial Statistics by Indicator"], ["Synthetic benchmark panel"]])
+    with pd.ExcelWriter(nfa_path) as writer:
+        title.to_excel(writer, sheet_name="Annual", startrow=1, startcol=1, index=False, header=False)
+        sheet.to_excel(writer, sheet_name="Annual", startrow=6, startcol=1, index=False)
+
+    csv = raw_fx.rename(columns={"Country": "COUNTRY"})
+    csv.insert(0, "DATASET", "IMF.RES:WEO(6.0.0)")
+    csv.insert(1, "SERIES_CODE", [f"S{i:05d}.PPPEX.A" for i in range(len(csv))])
+    csv.insert(2, "OBS_MEASURE", "OBS_VALUE")
+    csv.to_csv(fx_path, index=False)
+    return nfa_path, fx_path
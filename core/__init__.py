@@ -0,0 +1 @@
+# Shared data and model logic used by app.py and the pages/ scripts.
@@ -0,0 +1,88 @@
+import argparse
+import logging
+import sys
+import time
+
+import pandas as pd
+
+from core.backtest import method_overview
+from core.cache import read_artifact
+from core.forecast import MAX_HORIZON, METHODS
+from core.loader import current_data_version
+from core.pipeline import artifact_status, precompute
+from core.sources import DATA_DIR, load_sources, registered_sources
+
+# ---------------- Command line ----------------
+# Headless entry point, e.g. for a scheduled batch job on a box without the UI:
+#
+#     python -m core precompute                 # every missing artifact of the current data
+#     python -m core precompute --force --workers 8
+#     python -m core status                     # which artifacts exist for the current data
+#     python -m core sources                    # declared sources, their files and what they hold
+#     python -m core backtest                   # accuracy of each forecast method across countries
+#
+# The app picks the artifacts up from data/.cache (or SINGOFIN_CACHE_DIR).
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core", description="SingoFinApp headless data and model pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("precompute", help="load and clean the data, then write risk, simulation, tuning and forecast artifacts")
+    run.add_argument("--method", nargs="+", choices=METHODS, default=METHODS, help="forecast methods")
+    run.add_argument("--horizon", type=int, default=MAX_HORIZON)
+    run.add_argument("--window", type=int, default=5, help="Moving Average window")
+    run.add_argument("--workers", type=int, default=None, help="forecast worker processes (default: all cores)")
+    run.add_argument("--no-simulation", action="store_true", help="skip the Monte Carlo summaries")
+    run.add_argument("--no-forecast", action="store_true", help="skip the batch forecast")
+    run.add_argument("--no-tuning", action="store_true", help="skip the hyperparameter search (library defaults)")
+    run.add_argument("--no-backtest", action="store_true", help="skip the walk-forward backtest")
+    run.add_argument("--force", action="store_true", help="recompute artifacts that already exist")
+
+    commands.add_parser("status", help="show the current data version and its artifacts")
+    commands.add_parser("backtest", help="cross-country accuracy of each method from the stored backtest")
+
+    listing = commands.add_parser("sources", help="parse every declared source and list its indicators")
+    listing.add_argument("--workers", type=int, default=None, help="parser worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    if args.command == "precompute":
+        try:
+            precompute(args.method, args.horizon, args.window, args.workers,
+                       simulate=not args.no_simulation, forecast=not args.no_forecast,
+                       evaluate=not args.no_backtest, tuning=not args.no_tuning, force=args.force)
+        except Exception as e:
+            print(f"Precompute failed: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "sources":
+        for source in registered_sources():
+            files = source.files()
+            print(f"{source.name:<12} {source.frequency}  {source.layout:<13} {source.pattern}  ({len(files)} file(s))")
+        start = time.perf_counter()
+        store = load_sources(workers=args.workers)
+        print(f"\nParsed in {time.perf_counter() - start:.2f}s from {DATA_DIR}: {len(store)} values")
+        print(store.catalog().to_string(index=False))
+        return 0
+
+    version = current_data_version()
+    if args.command == "backtest":
+        summary = read_artifact("backtest", version)
+        if summary is None:
+            print(f"No backtest for data version {version}; run `python -m core precompute` first.")
+            return 1
+        pd.set_option("display.width", 160)
+        print(f"Walk-forward backtest, data version {version} (median over countries)")
+        print(method_overview(summary).to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+        return 0
+
+    print(f"Data version {version}")
+    for kind, exists in artifact_status(version).items():
+        print(f"  {kind:<28} {'ok' if exists else 'missing'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.forecast import MAX_HORIZON, METHODS, forecast_series, observed_xy
+from core.tuning import tune_series
+
+ERROR_COLUMNS = ["country", "unit", "method", "origin", "horizon", "year", "actual", "forecast"]
+SUMMARY_COLUMNS = ["country", "unit", "method", "horizon", "n", "mae", "mape", "rmse"]
+MIN_TRAIN = 5 # Observations before the first forecast origin
+
+
+# ---------------- Walk-forward backtest ----------------
+# Rolling-origin evaluation: for every origin t (MIN_TRAIN .. n-1 observed
+# years), each method is fitted on the observations before t exactly as the
+# prediction page fits it on the full history, and its 1..horizon year-ahead
+# forecasts are compared with what was observed afterwards. One fit per origin
+# serves every horizon, so the number of fits does not grow with the horizon.
+# Horizons count calendar years after the last training year; years with no
+# observation are skipped, not interpolated.
+#
+# The app's tuned hyperparameters were chosen on the last observed years, the
+# ones the backtest scores, so they are not used here. Instead the tuning of
+# core/tuning.py is rerun on the observations before the first origin only,
+# and those hyperparameters serve every origin: the backtest scores the tuning
+# procedure without letting it see any scored year.
+
+# One task per (unit, country); returns the rows of the error table. Runs in a worker process.
+def _backtest_task(task):
+    unit, country, years, values, methods, horizon, window_size, min_train, tuned_methods = task
+    X, y = observed_xy(years, values)
+    observed_years = X.ravel()
+    actual_by_year = dict(zip(observed_years.tolist(), y.tolist()))
+    rows = []
+    for method in methods:
+        first = max(min_train, window_size) if method == "Moving Average" else max(min_train, 2)
+        params = None
+        if method in tuned_methods and first < len(y):
+            tuned = tune_series(method, X[:first], y[:first])
+            params = tuned[0] if tuned is not None else None
+        for origin in range(first, len(y)):
+            result = forecast_series(observed_years[:origin], y[:origin], method, horizon, window_size,
+                                     n_jobs=1, params=params)
+            origin_year = int(observed_years[origin - 1])
+            for year, value in zip(result.future_years, result.forecast):
+                actual = actual_by_year.get(int(year))
+                if actual is not None:
+                    rows.append((country, unit, method, origin_year, int(year) - origin_year, int(year), actual, float(value)))
+    return rows
+
+
+# panels: {unit label: frame with a Country column followed by year columns}.
+# Returns one row per (country, unit, method, origin, horizon) forecast with its
+# actual value (ERROR_COLUMNS). tuned_methods: the methods the app uses tuned
+# hyperparameters for; they are tuned before the first origin (see above).
+def backtest(panels, methods=METHODS, horizon=MAX_HORIZON, window_size=5, min_train=MIN_TRAIN, workers=None,
+             tuned_methods=()):
+    tasks = []
+    for unit, df in panels.items():
+        year_cols = list(df.columns[1:])
+        years = np.array([int(y) for y in year_cols])
+        values = df[year_cols].to_numpy(dtype=float)
+        for country, row in zip(df["Country"], values):
+            tasks.append((unit, country, years, row, list(methods), horizon, window_size, min_train,
+                          set(tuned_methods)))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        rows = [row for task in tasks for row in _backtest_task(task)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_backtest_task, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+            rows = [row for task_rows in results for row in task_rows]
+    return pd.DataFrame(rows, columns=ERROR_COLUMNS)
+
+
+# ---------------- Accuracy tables ----------------
+# MAE, MAPE (in %, over non-zero actuals) and RMSE per (country, unit, method, horizon)
+def summarize_backtest(errors):
+    if errors.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    error = errors["forecast"] - errors["actual"]
+    actual = errors["actual"].where(errors["actual"] != 0)
+    frame = errors[["country", "unit", "method", "horizon"]].assign(
+        abs_error=error.abs(), sq_error=error ** 2, pct_error=(error / actual).abs() * 100,
+    )
+    summary = frame.groupby(["country", "unit", "method", "horizon"], sort=True).agg(
+        n=("abs_error", "size"), mae=("abs_error", "mean"), mape=("pct_error", "mean"), sq=("sq_error", "mean"),
+    ).reset_index()
+    summary["rmse"] = np.sqrt(summary.pop("sq"))
+    return summary[SUMMARY_COLUMNS]
+
+
+# Per (country, unit, method) accuracy pooled over horizons up to max_horizon
+# (each horizon weighted by its number of forecasts)
+def pooled_accuracy(summary, max_horizon=None):
+    if max_horizon is not None:
+        summary = summary[summary["horizon"] <= max_horizon]
+    weighted = summary.assign(
+        mae_n=summary["mae"] * summary["n"], mape_n=summary["mape"] * summary["n"], sq_n=summary["rmse"] ** 2 * summary["n"],
+    )
+    pooled = weighted.groupby(["country", "unit", "method"], sort=True)[["n", "mae_n", "mape_n", "sq_n"]].sum().reset_index()
+    pooled["mae"] = pooled.pop("mae_n") / pooled["n"]
+    pooled["mape"] = pooled.pop("mape_n") / pooled["n"]
+    pooled["rmse"] = np.sqrt(pooled.pop("sq_n") / pooled["n"])
+    return pooled
+
+
+# Method with the lowest pooled MAE per (country, unit)
+def best_models(summary, max_horizon=None):
+    pooled = pooled_accuracy(summary, max_horizon)
+    if pooled.empty:
+        return pd.DataFrame(columns=["country", "unit", "method", "mae"])
+    best = pooled.loc[pooled.groupby(["country", "unit"])["mae"].idxmin()]
+    return best[["country", "unit", "method", "mae"]].reset_index(drop=True)
+
+
+# Cross-country view per (unit, method, horizon): median of each country's errors
+def method_overview(summary):
+    return summary.groupby(["unit", "method", "horizon"], sort=True).agg(
+        countries=("country", "nunique"), mae=("mae", "median"), mape=("mape", "median"), rmse=("rmse", "median"),
+    ).reset_index()
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+import pandas as pd
+
+
+# ---------------- On-disk cache of the cleaned panels ----------------
+# The cleaned NFA / FX / USD frames (and the raw NFA / FX frames they came from,
+# used to diff the next vintage) are stored as Parquet files under
+# ./data/.cache/panels, in one folder per key. The key is a hash of the source files' contents plus the
+# version of the cleaning code, so editing a source file (or bumping the version)
+# points to a new folder and the stale one is removed on the next write.
+#
+# SINGOFIN_CACHE_DIR moves the whole cache, e.g. to a volume shared with the
+# box that runs `python -m core precompute`.
+
+CACHE_DIR = os.environ.get("SINGOFIN_CACHE_DIR", "./data/.cache")
+PANELS_DIR = os.path.join(CACHE_DIR, "panels")
+PANEL_NAMES = ("nfa", "fx", "usd", "nfa_raw", "fx_raw")
+
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+# To hash a file's content, re-reading it only when its size or mtime changed
+def file_digest(path):
+    stat = os.stat(path)
+    stamp = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        if stamp in _file_hashes:
+            return _file_hashes[stamp]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    digest = sha.hexdigest()
+
+    with _file_hashes_lock:
+        _file_hashes[stamp] = digest
+    return digest
+
+
+# Cache key for a set of source files and a cleaning-code version
+def fingerprint(paths, code_version):
+    sha = hashlib.sha256(f"cleaning-v{code_version}".encode())
+    for path in paths:
+        sha.update(os.path.basename(path).encode())
+        sha.update(file_digest(path).encode())
+    return sha.hexdigest()[:16]
+
+
+def _key_dir(key, cache_dir):
+    return os.path.join(cache_dir, key)
+
+
+# Returns the cached frames for this key, or None when there is no (complete) entry
+def read_panels(key, cache_dir=PANELS_DIR):
+    folder = _key_dir(key, cache_dir)
+    paths = [os.path.join(folder, f"{name}.parquet") for name in PANEL_NAMES]
+    if not all(os.path.exists(p) for p in paths):
+        return None
+    try:
+        return tuple(pd.read_parquet(p) for p in paths)
+    except Exception:
+        # A corrupt or half-written entry is treated as a miss and rebuilt
+        return None
+
+
+# Writes the frames to a temporary folder first and renames it into place, so a
+# concurrent reader never sees a partial entry. Older keys are dropped afterwards.
+def write_panels(key, frames, cache_dir=PANELS_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=cache_dir)
+    try:
+        for name, frame in zip(PANEL_NAMES, frames):
+            frame.to_parquet(os.path.join(tmp_dir, f"{name}.parquet"), index=False)
+        os.replace(tmp_dir, _key_dir(key, cache_dir))
+    except OSError:
+        # Another process published the same key first; its copy is just as good
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(_key_dir(key, cache_dir)):
+            raise
+
+    for entry in os.listdir(cache_dir):
+        if entry != key and not entry.startswith("."):
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+
+
+# ---------------- Other versioned artifacts ----------------
+# Derived tables (forecasts, ...) live in ./data/.cache/<kind>/<data version>.parquet.
+# As with the panels, writing one drops the other versions of the same kind.
+
+def artifact_path(kind, version, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, kind, f"{version}.parquet")
+
+
+# Modification time of the artifact, None when it does not exist. Pages add it
+# to their cache keys, so an artifact written after a page first ran (e.g. by
+# a precompute job) is picked up without a restart.
+def artifact_stamp(kind, version, cache_dir=CACHE_DIR):
+    try:
+        return os.stat(artifact_path(kind, version, cache_dir)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def read_artifact(kind, version, cache_dir=CACHE_DIR):
+    path = artifact_path(kind, version, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return None
+
+
+# Same write-then-rename pattern (and pruning) as write_panels, one file per
+# data version
+def write_artifact(kind, version, frame, cache_dir=CACHE_DIR):
+    path = artifact_path(kind, version, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{version}-", suffix=".parquet", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    folder, name = os.path.split(path)
+    for entry in os.listdir(folder):
+        if entry != name and not entry.startswith("."):
+            try:
+                os.remove(os.path.join(folder, entry))
+            except OSError:
+                pass
+    return path
@@ -0,0 +1,123 @@
+from functools import lru_cache
+from statistics import NormalDist
+
+import numpy as np
+
+from core.imports import lazy_import
+
+CLOSED_FORM_METHODS = ["Linear Regression", "Moving Average"]
+WINDOW_SIZES = range(2, 11) # Moving Average windows offered by the prediction page
+CI_LEVEL = 0.95 # Coverage of the forecast intervals
+
+
+# ---------------- Batched closed-form forecasts ----------------
+# Linear Regression (value on year) and the recursive Moving Average have
+# closed forms, so every series of a panel is forecast in a few array
+# operations instead of one model fit per country. `values` is (series, years)
+# with NaN gaps; as in observed_xy, gaps are left out: the trend is fitted on
+# the observed years only and the moving average runs over the observed values
+# in order. Forecasts start the year after each series' last observation.
+#
+# Intervals come from each series' residuals:
+#   Linear Regression  t prediction interval of OLS, s * sqrt(1 + 1/n + (x - x̄)² / Sxx)
+#   Moving Average     empirical h-step errors of the same recursion run from
+#                      every past window, with a normal quantile
+# Series too short for a method get NaN forecasts (and NaN intervals when there
+# are too few residuals).
+
+class ClosedFormForecast:
+    def __init__(self, future_years, forecast, lower, upper):
+        self.future_years = future_years # (series, horizon) int
+        self.forecast = forecast # (series, horizon)
+        self.lower = lower
+        self.upper = upper
+
+
+# Year after each series' last observation; 0 for an empty series
+def _next_years(years, observed):
+    last = observed.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    return np.where(observed.any(axis=1), years[last] + 1, 0)
+
+
+def linear_forecast(years, values, horizon, level=CI_LEVEL):
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    x = np.broadcast_to(np.asarray(years, dtype=float), values.shape)
+    observed = ~np.isnan(values)
+    n = observed.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(observed, x, 0).sum(axis=1) / n
+        y_mean = np.where(observed, values, 0).sum(axis=1) / n
+        dx = np.where(observed, x - x_mean[:, None], 0)
+        dy = np.where(observed, values - y_mean[:, None], 0)
+        sxx = (dx * dx).sum(axis=1)
+        slope = (dx * dy).sum(axis=1) / sxx
+        intercept = y_mean - slope * x_mean
+
+        next_years = _next_years(np.asarray(years), observed)
+        future_years = next_years[:, None] + np.arange(horizon)
+        forecast = intercept[:, None] + slope[:, None] * future_years
+        forecast[n < 2] = np.nan
+
+        residuals = np.where(observed, values - (intercept[:, None] + slope[:, None] * x), 0)
+        dof = n - 2
+        s = np.sqrt((residuals ** 2).sum(axis=1) / dof)
+        s[dof < 1] = np.nan
+        t = lazy_import("scipy.stats").t.ppf(0.5 + level / 2, np.maximum(dof, 1))
+        half = (t * s)[:, None] * np.sqrt(1 + 1 / n[:, None] + (future_years - x_mean[:, None]) ** 2 / sxx[:, None])
+    return ClosedFormForecast(future_years.astype(int), forecast, forecast - half, forecast + half)
+
+
+# Weights (horizon, window) such that forecast h = weights[h - 1] @ last `window`
+# values (oldest first): the recursion applied to the unit vectors. Cached, as
+# live single-series forecasts ask for the same few shapes over and over.
+@lru_cache(maxsize=64)
+def moving_average_weights(window, horizon):
+    buffer = np.eye(window)
+    weights = np.empty((horizon, window))
+    for h in range(horizon):
+        weights[h] = buffer[-window:].mean(axis=0)
+        buffer = np.vstack([buffer, weights[h]])
+    weights.flags.writeable = False
+    return weights
+
+
+# Observed values of each series right-aligned (oldest first), NaN-padded on
+# the left, so the last `w` columns hold the last w observations
+def _right_aligned(values, observed):
+    rank = np.cumsum(observed[:, ::-1], axis=1)[:, ::-1] # 1 for the last observation
+    aligned = np.full(values.shape, np.nan)
+    rows, cols = np.nonzero(observed)
+    aligned[rows, values.shape[1] - rank[rows, cols]] = values[rows, cols]
+    return aligned
+
+
+# {window: ClosedFormForecast} for every window in `windows`
+def moving_average_forecast(years, values, horizon, windows=WINDOW_SIZES, level=CI_LEVEL):
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    observed = ~np.isnan(values)
+    n = observed.sum(axis=1)
+    aligned = _right_aligned(values, observed)
+    next_years = _next_years(np.asarray(years), observed)
+    future_years = (next_years[:, None] + np.arange(horizon)).astype(int)
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+
+    results = {}
+    for window in windows:
+        weights = moving_average_weights(window, horizon)
+        forecast = aligned[:, -window:] @ weights.T
+        forecast[n < window] = np.nan
+
+        # h-step errors from every past window of the observed values
+        past = np.lib.stride_tricks.sliding_window_view(aligned, window, axis=1)[:, :-1] # (series, origins, window)
+        predicted = past @ weights.T # (series, origins, horizon)
+        origins = past.shape[1]
+        errors = np.full(predicted.shape, np.nan)
+        for h in range(horizon):
+            if origins > h:
+                errors[:, :origins - h, h] = aligned[:, window + h:] - predicted[:, :origins - h, h]
+        with np.errstate(invalid="ignore"):
+            counts = (~np.isnan(errors)).sum(axis=1)
+            sigma = np.sqrt(np.nansum(errors ** 2, axis=1) / counts)
+        sigma[counts < 2] = np.nan
+        results[window] = ClosedFormForecast(future_years, forecast, forecast - z * sigma, forecast + z * sigma)
+    return results
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+
+# ---------------- To convert NFA (domestic currency) into USD ----------------
+# Both panels are aligned once on the Country index and the NFA year columns, then
+# divided in a single array operation. Same guards as the original loop: a missing
+# NFA value, a missing FX rate or a zero FX rate gives NaN. A country without an FX
+# row (or a year absent from the FX file) also gives NaN and is reported back.
+def convert_nfa_to_usd(df_nfa, df_fx):
+    year_cols = list(df_nfa.columns[1:])
+
+    # First FX row wins for duplicated country names, like fx_row[year].values[0] did
+    fx_by_country = df_fx.drop_duplicates(subset="Country").set_index("Country")
+    fx_aligned = fx_by_country.reindex(index=df_nfa["Country"], columns=year_cols)
+
+    nfa_values = df_nfa[year_cols].to_numpy(dtype=float)
+    fx_values = fx_aligned.to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        usd_values = np.where(fx_values != 0, nfa_values / fx_values, np.nan)
+
+    df_usd = pd.DataFrame(usd_values, columns=year_cols)
+    df_usd.insert(0, "Country", df_nfa["Country"].to_numpy())
+
+    matched = df_nfa["Country"].isin(fx_by_country.index)
+    unmatched_countries = df_nfa.loc[~matched, "Country"].tolist()
+    return df_usd, unmatched_countries
@@ -0,0 +1,163 @@
+import difflib
+import json
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+
+from core.cache import CACHE_DIR
+from core.imports import lazy_import
+
+
+# ---------------- Country name -> ISO alpha-3 resolution ----------------
+# IMF names ("Korea, Rep. of", "China, P.R.: Hong Kong", "Kyrgyz Rep.") often
+# do not match pycountry directly. Each name is resolved once, trying in order:
+#   1. exact pycountry lookup (names and codes)
+#   2. the IMF alias table below (normalized spelling)
+#   3. pycountry's names, official names and common names, normalized, also
+#      after dropping IMF qualifiers such as ", Rep. of" or ", The"
+#   4. a close fuzzy match on those normalized names
+# Aggregates (Euro Area, ECCU, WAEMU, ...) stay unresolved. Results and the
+# list of unresolved names are kept in ./data/.cache/country_index.json, so
+# later loads only resolve names they have not seen before.
+
+RESOLVER_VERSION = 1
+INDEX_PATH = os.path.join(CACHE_DIR, "country_index.json")
+FUZZY_CUTOFF = 0.88
+
+# Keys are normalized with normalize_name()
+ALIASES = {
+    "korea rep of": "KOR",
+    "china peoples rep of": "CHN",
+    "china pr mainland": "CHN",
+    "china pr hong kong": "HKG",
+    "hong kong special administrative region peoples rep of china": "HKG",
+    "china pr macao": "MAC",
+    "macao special administrative region peoples rep of china": "MAC",
+    "congo dem rep of the": "COD",
+    "congo rep of": "COG",
+    "iran islamic rep of": "IRN",
+    "lao pdr": "LAO",
+    "lao peoples dem rep": "LAO",
+    "micronesia fed states of": "FSM",
+    "taiwan province of china": "TWN",
+    "west bank and gaza": "PSE",
+    "venezuela rep bolivariana de": "VEN",
+    "venezuela republica bolivariana de": "VEN",
+    "kosovo rep of": "XKX",
+}
+
+# Words that may follow the comma in an IMF name without changing the country
+_QUALIFIER_WORDS = {
+    "rep", "of", "the", "islamic", "kingdom", "dem", "principality", "union",
+    "state", "arab", "united", "federal", "netherlands", "plurinational",
+}
+
+_TOKEN_REPLACEMENTS = {"republic": "rep", "democratic": "dem", "st": "saint", "&": "and"}
+
+
+def normalize_name(name):
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = text.replace("'", "").replace(".", "").replace("&", " and ")
+    tokens = re.sub(r"[^a-z0-9]+", " ", text).split()
+    return " ".join(_TOKEN_REPLACEMENTS.get(t, t) for t in tokens)
+
+
+# "Egypt, Arab Rep. of" -> "egypt"; names without a qualifier are unchanged
+def strip_qualifiers(name):
+    head, sep, tail = str(name).partition(",")
+    if not sep:
+        return normalize_name(name)
+    if set(normalize_name(tail).split()) <= _QUALIFIER_WORDS:
+        return normalize_name(head)
+    return normalize_name(name)
+
+
+_name_table = None
+_name_table_lock = threading.Lock()
+
+
+# Normalized pycountry names -> alpha-3, built on first use
+def _pycountry_names():
+    global _name_table
+    with _name_table_lock:
+        if _name_table is None:
+            pycountry = lazy_import("pycountry")
+            table = {}
+            for country in pycountry.countries:
+                for attr in ("name", "official_name", "common_name"):
+                    value = getattr(country, attr, None)
+                    if value:
+                        table.setdefault(normalize_name(value), country.alpha_3)
+            _name_table = table
+        return _name_table
+
+
+# Returns (alpha-3 or None, how it was resolved)
+def resolve_country(name):
+    pycountry = lazy_import("pycountry")
+    try:
+        return pycountry.countries.lookup(name).alpha_3, "exact"
+    except LookupError:
+        pass
+
+    normalized = normalize_name(name)
+    if normalized in ALIASES:
+        return ALIASES[normalized], "alias"
+
+    table = _pycountry_names()
+    stripped = strip_qualifiers(name)
+    for key in (normalized, stripped):
+        if key in table:
+            return table[key], "normalized"
+
+    match = difflib.get_close_matches(stripped, table.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    if match:
+        return table[match[0]], "fuzzy"
+    return None, "unresolved"
+
+
+def _read_index(path):
+    try:
+        with open(path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("resolver_version") != RESOLVER_VERSION:
+        return {}
+    return index.get("countries", {})
+
+
+def _write_index(path, countries):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = {
+        "resolver_version": RESOLVER_VERSION,
+        "countries": countries,
+        "unresolved": sorted(n for n, entry in countries.items() if entry["iso3"] is None),
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix=".country_index-", suffix=".json", dir=os.path.dirname(path))
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f, indent=1, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Resolution index for `names`: {name: alpha-3 or None}. Names already in the
+# on-disk index are not looked up again.
+def build_country_index(names, path=INDEX_PATH):
+    countries = _read_index(path)
+    missing = [n for n in dict.fromkeys(names) if n not in countries]
+    for name in missing:
+        iso3, method = resolve_country(name)
+        countries[name] = {"iso3": iso3, "method": method}
+    if missing:
+        try:
+            _write_index(path, countries)
+        except OSError:
+            pass # The index is only a cache
+    return {name: countries[name]["iso3"] for name in names}
+
+
+def unresolved_countries(index):
+    return sorted(name for name, iso3 in index.items() if iso3 is None)
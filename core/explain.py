@@ -0,0 +1,100 @@
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from core.imports import lazy_import
+
+
+# ---------------- SHAP explanations in the background ----------------
+# Explanations are computed on a small worker pool so the forecast can render
+# first, and are kept per fitted model (same key as the model cache). Each job
+# produces the SHAP values and the rendered beeswarm as PNG bytes, so showing a
+# finished explanation again is just an image.
+
+# pyplot keeps global state, so only one figure is drawn at a time
+_plot_lock = threading.Lock()
+
+
+class Explanation:
+    def __init__(self, shap_values, image):
+        self.shap_values = shap_values
+        self.image = image # PNG bytes of the summary (beeswarm) plot
+
+
+# shap and matplotlib are only imported once an explanation is requested
+def explain_model(model, X, feature_names=("Year",)):
+    shap = lazy_import("shap")
+    plt = lazy_import("matplotlib.pyplot")
+
+    explainer = shap.Explainer(model, X)
+    shap_values = explainer(X)
+    shap_values.feature_names = list(feature_names)
+
+    with _plot_lock:
+        fig, ax = plt.subplots()
+        try:
+            shap.plots.beeswarm(shap_values, show=False)
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight")
+        finally:
+            plt.close("all")
+    return Explanation(shap_values, buffer.getvalue())
+
+
+class ExplanationService:
+    def __init__(self, max_workers=1, max_entries=64):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shap")
+        self._jobs = OrderedDict() # key -> Future[Explanation]
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    # Starts the explanation for `key` unless it is already running or done.
+    # get_model is called on the worker, so a refit never blocks the page.
+    def request(self, key, get_model, X):
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self._jobs.move_to_end(key)
+                return future
+            future = self._pool.submit(lambda: explain_model(get_model(), X))
+            self._jobs[key] = future
+            self._evict()
+            return future
+
+    # Lower-priority path for the background warm-up (core/warmup.py): computes
+    # the explanation on the calling thread, so it never queues on the pool
+    # ahead of a user's request. A request made for the key in the meantime
+    # keeps its own job.
+    def precompute(self, key, get_model, X):
+        with self._lock:
+            if key in self._jobs:
+                return self._jobs[key]
+        future = Future()
+        try:
+            future.set_result(explain_model(get_model(), X))
+        except Exception as e:
+            future.set_exception(e)
+        with self._lock:
+            future = self._jobs.setdefault(key, future)
+            self._evict()
+            return future
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    # Drops the oldest finished jobs beyond max_entries (running jobs are kept)
+    def _evict(self):
+        for key in list(self._jobs):
+            if len(self._jobs) <= self._max_entries:
+                break
+            if self._jobs[key].done():
+                del self._jobs[key]
+
+
+_service = ExplanationService()
+
+
+def get_explanation_service():
+    return _service
@@ -0,0 +1,86 @@
+import io
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ---------------- Dataset exports ----------------
+# Exports are produced only when a download is requested and kept per data
+# version, so a rerun never re-serializes the panels. They are not streamed:
+# st.download_button needs the whole file as bytes, which it keeps in memory
+# to serve the download. CSV is written in row chunks and Parquet / Arrow IPC
+# in record batches into one buffer, so building a file needs the file plus a
+# chunk, not a full text copy of the frame too; returning it copies the buffer
+# once more. The cache holds at most max_entries files.
+
+EXPORT_FORMATS = {
+    # label: (file extension, MIME type)
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file"),
+}
+CHUNK_ROWS = 50_000
+
+
+def iter_csv_chunks(frame, chunk_rows=CHUNK_ROWS):
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def _record_batches(frame, chunk_rows):
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+
+def export_bytes(frame, fmt, chunk_rows=CHUNK_ROWS):
+    buffer = io.BytesIO()
+    if fmt == "CSV":
+        for chunk in iter_csv_chunks(frame, chunk_rows):
+            buffer.write(chunk)
+    elif fmt == "Parquet":
+        schema = pa.Schema.from_pandas(frame, preserve_index=False)
+        with pq.ParquetWriter(buffer, schema) as writer:
+            for batch in _record_batches(frame, chunk_rows):
+                writer.write_batch(batch)
+    elif fmt == "Arrow IPC":
+        schema = pa.Schema.from_pandas(frame, preserve_index=False)
+        with pa.ipc.new_file(buffer, schema) as writer:
+            for batch in _record_batches(frame, chunk_rows):
+                writer.write_batch(batch)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return buffer.getvalue()
+
+
+class ExportCache:
+    def __init__(self, max_entries=12):
+        self._entries = OrderedDict() # (version, name, fmt) -> bytes
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def get(self, version, name, frame, fmt):
+        key = (version, name, fmt)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        data = export_bytes(frame, fmt)
+        with self._lock:
+            # Exports of older data versions are never requested again
+            for old_key in [k for k in self._entries if k[0] != version]:
+                del self._entries[old_key]
+            self._entries[key] = data
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+
+_export_cache = ExportCache()
+
+
+def get_export(version, name, frame, fmt):
+    return _export_cache.get(version, name, frame, fmt)
@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core.imports import lazy_import
+
+MAX_FIGURES = 128
+
+
+# ---------------- Dashboard figures ----------------
+# Built with plotly.graph_objects on layouts shared by every figure of a kind,
+# the same output plotly.express gives for these charts without its per-call
+# overhead. Only the traces differ between two maps (or two trends). Plotly
+# sends numeric arrays as base64 typed arrays; they are sent as float32 (7
+# significant digits, see core/memory.py), half the bytes of float64, which is
+# plenty for a chart.
+
+MAP_LAYOUT = {
+    "geo": {"domain": {"x": [0.0, 1.0], "y": [0.0, 1.0]}, "center": {}, "bgcolor": "rgba(0,0,0,0)"},
+    "coloraxis": {"colorbar": {"title": {"text": "Amount"}}, "autocolorscale": False},
+    "legend": {"tracegroupgap": 0},
+    "margin": {"l": 0, "r": 0, "t": 0, "b": 0},
+}
+MAP_HOVER = "<b>%{hovertext}</b><br><br>iso_alpha=%{location}<br>Amount=%{z}<extra></extra>"
+
+TREND_LAYOUT = {
+    "xaxis": {"anchor": "y", "domain": [0.0, 1.0], "title": {"text": "Year"}},
+    "yaxis": {"anchor": "x", "domain": [0.0, 1.0], "title": {"text": "Net Foreign Assets"}},
+    "legend": {"tracegroupgap": 0},
+    "plot_bgcolor": "rgba(0,0,0,0)",
+    "paper_bgcolor": "rgba(0,0,0,0)",
+    "font": {"color": "white"},
+}
+TREND_HOVER = "Year=%{x}<br>Net Foreign Assets=%{y}<extra></extra>"
+
+
+# year_values: one year of the panel (Series indexed by country); countries
+# without an ISO code are left off the map
+def choropleth_figure(year_values, iso_codes):
+    go = lazy_import("plotly.graph_objects")
+    iso_alpha = year_values.index.map(iso_codes)
+    on_map = iso_alpha.notna()
+    layout = dict(MAP_LAYOUT, coloraxis=dict(MAP_LAYOUT["coloraxis"], colorscale=lazy_import("plotly.colors").sequential.Plasma))
+    trace = go.Choropleth(
+        locations=np.asarray(iso_alpha[on_map], dtype=object),
+        z=year_values.to_numpy(dtype=np.float32)[on_map],
+        hovertext=np.asarray(year_values.index[on_map], dtype=object),
+        geo="geo", coloraxis="coloraxis", hovertemplate=MAP_HOVER, name="",
+    )
+    return go.Figure(trace, layout=layout)
+
+
+# trend: one country's series (indexed by year)
+def trend_figure(trend, title):
+    go = lazy_import("plotly.graph_objects")
+    trace = go.Scatter(
+        x=np.asarray(trend.index, dtype=object), y=trend.to_numpy(dtype=np.float32),
+        mode="lines+markers", marker={"symbol": "circle"}, hovertemplate=TREND_HOVER,
+        name="", showlegend=False,
+    )
+    return go.Figure(trace, layout=dict(TREND_LAYOUT, title={"text": title}))
+
+
+# ---------------- Figure cache ----------------
+# The dashboard only ever shows len(years) x 2 maps and one trend per country
+# and unit, so each is built once per data version and every later rerun is a
+# lookup; st.plotly_chart then only serializes the cached figure. Figures of an
+# older data version are dropped when a new one is requested. The figures are
+# shared by every session, so callers must not modify them.
+class FigureCache:
+    def __init__(self, max_entries=MAX_FIGURES):
+        self._entries = OrderedDict() # (version, kind, key) -> figure
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, kind, key, build):
+        cache_key = (version, kind, key)
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return self._entries[cache_key]
+            self.misses += 1
+        figure = build()
+        with self._lock:
+            for old_key in [k for k in self._entries if k[0] != version]:
+                del self._entries[old_key]
+            self._entries[cache_key] = figure
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return figure
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_figure_cache = FigureCache()
+
+
+def get_figure_cache():
+    return _figure_cache
+
+
+def get_figure(version, kind, key, build):
+    return _figure_cache.get(version, kind, key, build)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+
+# ------------ To fill the missing values in the data ------------
+# Same rule as the original row-wise helper, applied to a whole 2-D array at once:
+#   - a gap after the first observation takes the mean of all earlier observed values
+#   - a leading gap takes the mean of all later observed values
+#   - a row with no data at all stays NaN
+# Means are taken over the original observations only (filled cells never feed
+# later fills), so each cell only needs running sums and counts from each side.
+def fill_directional_average(values):
+    values = np.asarray(values, dtype=float)
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[np.newaxis, :]
+
+    observed = ~np.isnan(values)
+    zeroed = np.where(observed, values, 0.0)
+
+    # Exclusive running sums/counts of the observed values before each cell
+    prior_sum = np.cumsum(zeroed, axis=1) - zeroed
+    prior_count = np.cumsum(observed, axis=1) - observed
+
+    # Exclusive running sums/counts after each cell (cumsum of the reversed row)
+    after_sum = np.cumsum(zeroed[:, ::-1], axis=1)[:, ::-1] - zeroed
+    after_count = np.cumsum(observed[:, ::-1], axis=1)[:, ::-1] - observed
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        prior_mean = prior_sum / prior_count
+        after_mean = after_sum / after_count
+
+    fill = np.where(prior_count > 0, prior_mean, np.where(after_count > 0, after_mean, np.nan))
+    filled = np.where(observed, values, fill)
+    return filled[0] if squeeze else filled
+
+
+# Row-wise wrapper kept for code that still works on a single pandas row
+def fill_with_directional_average(row):
+    return pd.Series(fill_directional_average(row.to_numpy(dtype=float)), index=row.index, name=row.name)
+
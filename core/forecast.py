@@ -0,0 +1,208 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.cache import read_artifact, write_artifact
+from core.closed_form import CLOSED_FORM_METHODS, WINDOW_SIZES, linear_forecast, moving_average_forecast
+from core.imports import lazy_import
+
+MAX_HORIZON = 5 # Longest forecast offered by the prediction page
+METHODS = ["Decision Tree", "Random Forest", "XGBoost", "Linear Regression", "Moving Average"]
+TREE_METHODS = ["Decision Tree", "Random Forest", "XGBoost"]
+FORECAST_COLUMNS = ["country", "unit", "method", "window", "year", "value", "lower", "upper"]
+
+
+# ---------------- Models ----------------
+# Fixed seeds so a batch forecast and a live refit of the same series agree.
+# Only the selected method's library is imported. `params` overrides the
+# library defaults, e.g. with the tuned ones of core/tuning.py.
+def make_model(method, n_jobs=None, params=None):
+    if method == "Linear Regression":
+        model = lazy_import("sklearn.linear_model").LinearRegression()
+    elif method == "Decision Tree":
+        model = lazy_import("sklearn.tree").DecisionTreeRegressor(random_state=0)
+    elif method == "Random Forest":
+        model = lazy_import("sklearn.ensemble").RandomForestRegressor(random_state=0, n_jobs=n_jobs)
+    elif method == "XGBoost":
+        model = lazy_import("xgboost").XGBRegressor(n_jobs=n_jobs)
+    else:
+        raise ValueError(f"Unknown prediction method: {method}")
+    if params:
+        model.set_params(**params)
+    return model
+
+
+# Hyperparameters that identify a fitted forecast (used in cache keys)
+def model_params(method, window_size=5, params=None):
+    if method == "Moving Average":
+        return {"window": window_size}
+    return make_model(method, params=params).get_params()
+
+
+def fit_model(method, X, y, n_jobs=None, params=None):
+    model = make_model(method, n_jobs=n_jobs, params=params)
+    model.fit(X, y)
+    return model
+
+
+# Observed (X, y) of one country's row; NaN years are left out
+def observed_xy(years, values):
+    years = np.asarray(years, dtype=int)
+    values = np.asarray(values, dtype=float)
+    valid_mask = ~np.isnan(values)
+    return years[valid_mask].reshape(-1, 1), values[valid_mask]
+
+
+class ForecastResult:
+    def __init__(self, X, y, future_years=(), forecast=(), lower=None, upper=None, model=None, message=None):
+        self.X = X # Observed years, shape (n, 1)
+        self.y = y # Observed values
+        self.future_years = np.asarray(future_years, dtype=int)
+        self.forecast = np.asarray(forecast, dtype=float)
+        self.lower = None if lower is None else np.asarray(lower, dtype=float) # Interval bounds (closed-form methods)
+        self.upper = None if upper is None else np.asarray(upper, dtype=float)
+        self.model = model # Fitted model (None for closed-form methods or on failure)
+        self.message = message # Why no forecast was produced, if any
+
+    # Same fit, forecast cut to the first `horizon` years
+    def head(self, horizon):
+        cut = lambda a: None if a is None else a[:horizon]
+        return ForecastResult(self.X, self.y, self.future_years[:horizon], self.forecast[:horizon],
+                              cut(self.lower), cut(self.upper), self.model, self.message)
+
+    @property
+    def all_years(self):
+        return list(self.X.flatten()) + list(self.future_years)
+
+    @property
+    def all_values(self):
+        return list(self.y) + list(self.forecast)
+
+
+# ---------------- Single series ----------------
+def forecast_series(years, values, method, horizon, window_size=5, n_jobs=None, params=None):
+    X, y = observed_xy(years, values)
+
+    # Closed forms (core/closed_form.py), on this one series
+    if method == "Moving Average":
+        if len(y) < window_size:
+            return ForecastResult(X, y, message=f"Not enough data for Moving Average (need at least {window_size} valid years).")
+        result = moving_average_forecast(years, values, horizon, [window_size])[window_size]
+        return ForecastResult(X, y, result.future_years[0], result.forecast[0], result.lower[0], result.upper[0])
+
+    if len(y) <= 1:
+        return ForecastResult(X, y, message="Not enough data to train the model.")
+    if method == "Linear Regression":
+        result = linear_forecast(years, values, horizon)
+        return ForecastResult(X, y, result.future_years[0], result.forecast[0], result.lower[0], result.upper[0])
+    model = fit_model(method, X, y, n_jobs=n_jobs, params=params)
+    future_years = np.arange(X.max() + 1, X.max() + 1 + horizon)
+    forecast = model.predict(future_years.reshape(-1, 1))
+    return ForecastResult(X, y, future_years, forecast, model=model)
+
+
+# ---------------- Batch engine ----------------
+# One task per (unit, country): every method is fitted on that series and the
+# rows of the tidy table are returned. Runs in a worker process.
+def _forecast_task(task):
+    unit, country, years, values, methods, horizon, window_size, params = task
+    rows = []
+    for method in methods:
+        # Each worker already owns a core, so the models stay single-threaded
+        result = forecast_series(years, values, method, horizon, window_size, n_jobs=1, params=params.get(method))
+        for year, value in zip(result.future_years, result.forecast):
+            rows.append((country, unit, method, 0, int(year), float(value), np.nan, np.nan))
+    return rows
+
+
+# Rows of the closed-form methods for a whole panel in one call; Moving Average
+# for every window the page offers
+def _closed_form_rows(unit, df, methods, horizon, window_size):
+    years = np.array([int(y) for y in df.columns[1:]])
+    values = df[df.columns[1:]].to_numpy(dtype=float)
+    results = []
+    if "Linear Regression" in methods:
+        results.append(("Linear Regression", 0, linear_forecast(years, values, horizon)))
+    if "Moving Average" in methods:
+        windows = sorted(set(WINDOW_SIZES) | {window_size})
+        results += [("Moving Average", w, r) for w, r in moving_average_forecast(years, values, horizon, windows).items()]
+
+    countries = df["Country"].to_numpy(dtype=object)
+    frames = []
+    for method, window, r in results:
+        valid = ~np.isnan(r.forecast[:, 0])
+        frames.append(pd.DataFrame({
+            "country": np.repeat(countries[valid], horizon), "unit": unit, "method": method, "window": window,
+            "year": r.future_years[valid].ravel(), "value": r.forecast[valid].ravel(),
+            "lower": r.lower[valid].ravel(), "upper": r.upper[valid].ravel(),
+        }))
+    return frames
+
+
+# Hyperparameters of one series: {method: params} out of {(country, unit, method): params}
+def series_params(tuned, country, unit, methods):
+    if not tuned:
+        return {}
+    return {m: tuned[(country, unit, m)] for m in methods if (country, unit, m) in tuned}
+
+
+# panels: {unit label: frame with a Country column followed by year columns}
+# Returns a tidy table (country, unit, method, window, year, value, lower,
+# upper) covering horizons 1..horizon; shorter horizons are a prefix of the
+# longest one. Model-based methods are fitted per series in a process pool;
+# the closed-form ones are computed for the whole panel at once, with their
+# intervals (NaN bounds for the other methods).
+# tuned: {(country, unit, method): params} from core/tuning.py, if any.
+def batch_forecast(panels, methods=METHODS, horizon=5, window_size=5, workers=None, tuned=None):
+    model_methods = [m for m in methods if m not in CLOSED_FORM_METHODS]
+    closed_form = [m for m in methods if m in CLOSED_FORM_METHODS]
+    tasks, frames = [], []
+    for unit, df in panels.items():
+        frames += _closed_form_rows(unit, df, closed_form, horizon, window_size)
+        if not model_methods:
+            continue
+        year_cols = list(df.columns[1:])
+        years = np.array([int(y) for y in year_cols])
+        values = df[year_cols].to_numpy(dtype=float)
+        for country, row in zip(df["Country"], values):
+            tasks.append((unit, country, years, row, model_methods, horizon, window_size,
+                          series_params(tuned, country, unit, model_methods)))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = map(_forecast_task, tasks)
+        rows = [row for task_rows in results for row in task_rows]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_forecast_task, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+            rows = [row for task_rows in results for row in task_rows]
+
+    table = pd.concat([pd.DataFrame(rows, columns=FORECAST_COLUMNS)] + frames, ignore_index=True)
+    return table.astype({"window": "int64", "year": "int64", "value": float, "lower": float, "upper": float})
+
+
+# ---------------- Stored forecast tables ----------------
+def save_forecast_table(table, version):
+    return write_artifact("forecasts", version, table)
+
+
+def load_forecast_table(version):
+    return read_artifact("forecasts", version)
+
+
+# Stored forecast for one selection as (future_years, values, lower, upper), or
+# None if the table does not cover it; the bounds are None without an interval
+def lookup_forecast(table, country, unit, method, horizon, window_size=5):
+    window = window_size if method == "Moving Average" else 0
+    rows = table[
+        (table["country"] == country) & (table["unit"] == unit)
+        & (table["method"] == method) & (table["window"] == window)
+    ].sort_values("year")
+    if len(rows) < horizon:
+        return None
+    rows = rows.head(horizon)
+    if "lower" not in rows or rows["lower"].isna().all():
+        return rows["year"].to_numpy(), rows["value"].to_numpy(), None, None
+    return rows["year"].to_numpy(), rows["value"].to_numpy(), rows["lower"].to_numpy(), rows["upper"].to_numpy()
@@ -0,0 +1,55 @@
+import importlib
+import subprocess
+import sys
+import threading
+import time
+
+
+# ---------------- Deferred imports of the heavy libraries ----------------
+# xgboost, shap, scikit-learn and matplotlib take seconds to import, so the
+# code paths that need them import them through lazy_import() at the point of
+# use. The first import of each module is timed, which gives a per-module load
+# time report for the running process (import_report) and, from the command
+# line, a cold-import report measured in fresh interpreters:
+#
+#     python -m core.imports
+
+HEAVY_MODULES = [
+    "xgboost", "shap", "sklearn.ensemble", "sklearn.tree", "sklearn.linear_model",
+    "matplotlib.pyplot", "pycountry", "plotly.express", "pandas", "numpy",
+]
+
+_import_times = {} # module name -> seconds spent on its first import here
+_lock = threading.Lock()
+
+
+def lazy_import(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _import_times.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+# Per-module load times seen by this process, slowest first
+def import_report():
+    with _lock:
+        return sorted(_import_times.items(), key=lambda item: item[1], reverse=True)
+
+
+# Cold import time of each module, each in its own interpreter so nothing is preloaded
+def measure_cold_imports(modules=HEAVY_MODULES):
+    timings = {}
+    for name in modules:
+        code = f"import time; t = time.perf_counter(); import {name}; print(time.perf_counter() - t)"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        timings[name] = float(out.stdout.strip()) if out.returncode == 0 else None
+    return timings
+
+
+if __name__ == "__main__":
+    for name, seconds in measure_cold_imports().items():
+        print(f"{name:<24} {'not installed' if seconds is None else f'{seconds * 1000:8.1f} ms'}")
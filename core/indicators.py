@@ -0,0 +1,68 @@
+import pandas as pd
+
+from core.memory import nbytes
+
+KEY = ["indicator", "frequency", "country", "period"]
+
+
+# ---------------- Indexed multi-indicator store ----------------
+# All parsed sources as one long table indexed by (indicator, frequency,
+# country, period), sorted, so one indicator at one frequency, or one country's
+# series, is a slice of the index. The MultiIndex keeps each distinct indicator,
+# country and period once and codes the rows with integers. Only observed values
+# are stored; gaps are simply absent rows.
+
+class IndicatorStore:
+    def __init__(self, table):
+        self.table = table # value column, indexed by KEY
+        self._pairs = set(table.index.droplevel(["country", "period"]).unique()) # (indicator, frequency)
+
+    @classmethod
+    def from_long(cls, parts):
+        parts = [p for p in parts if p is not None and len(p)]
+        if parts:
+            long = pd.concat(parts, ignore_index=True)
+            # Later parts come from newer files and win on duplicated keys
+            long = long.drop_duplicates(subset=KEY, keep="last")
+        else:
+            long = pd.DataFrame({k: pd.Series(dtype=object) for k in KEY}).assign(value=pd.Series(dtype=float))
+        return cls(long.set_index(KEY)[["value"]].sort_index())
+
+    def __len__(self):
+        return len(self.table)
+
+    # One row per (indicator, frequency): number of countries and periods, first and last period
+    def catalog(self):
+        index = self.table.index
+        frame = pd.DataFrame({
+            "indicator": index.get_level_values("indicator"),
+            "frequency": index.get_level_values("frequency"),
+            "country": index.get_level_values("country"),
+            "period": index.get_level_values("period"),
+        })
+        return frame.groupby(["indicator", "frequency"], sort=True).agg(
+            countries=("country", "nunique"), periods=("period", "nunique"),
+            first=("period", "min"), last=("period", "max"), values=("period", "size"),
+        ).reset_index()
+
+    def has(self, indicator, frequency="A"):
+        return (indicator, frequency) in self._pairs
+
+    # Wide frame (Country + one column per period), the layout of the NFA / FX panels
+    def frame(self, indicator, frequency="A"):
+        if not self.has(indicator, frequency):
+            return pd.DataFrame(columns=["Country"])
+        wide = self.table.loc[(indicator, frequency), "value"].unstack("period")
+        wide.columns = list(wide.columns)
+        return wide.rename_axis("Country").reset_index()
+
+    # One country's values, indexed by period
+    def series(self, indicator, country, frequency="A"):
+        try:
+            values = self.table.loc[(indicator, frequency, country), "value"]
+        except KeyError:
+            return pd.Series(dtype=float, name=country)
+        return values.rename(country)
+
+    def memory_usage(self):
+        return nbytes(self.table)
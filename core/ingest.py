@@ -0,0 +1,123 @@
+import numpy as np
+
+from core.convert import convert_nfa_to_usd
+from core.fill import fill_directional_average
+from core.sources import DATA_DIR, FX_SOURCE, NFA_SOURCE, parallel_map, parse_source
+
+
+# ---------------- Source discovery ----------------
+# New IMF vintages are dropped into ./data next to the old ones; the most
+# recently modified file matching each pattern is the one in use. The file
+# layouts are declared in core/sources.py.
+NFA_PATTERN = NFA_SOURCE.pattern
+FX_PATTERN = FX_SOURCE.pattern
+
+
+def discover_sources(data_dir=DATA_DIR):
+    sources = []
+    for label, source in (("NFA", NFA_SOURCE), ("FX data", FX_SOURCE)):
+        matches = source.files(data_dir)
+        if not matches:
+            raise FileNotFoundError(f"{label} file not found!")
+        sources.append(matches[-1])
+    return tuple(sources)
+
+
+# ---------------- Parsing (raw, before gap filling) ----------------
+# Year columns are read from the header ("2015", 2015, "2015-...") instead of
+# fixed positions, so a release with more years needs no code change
+def parse_nfa(path):
+    return parse_source(NFA_SOURCE, path)
+
+
+def parse_fx(path):
+    return parse_source(FX_SOURCE, path)
+
+
+def _parse_pair(task):
+    source, path = task
+    return parse_source(source, path)
+
+
+# Both raw frames, parsed concurrently when core/sources.py decides it pays off
+def parse_nfa_fx(nfa_path, fx_path, workers=None):
+    return tuple(parallel_map(_parse_pair, [(NFA_SOURCE, nfa_path), (FX_SOURCE, fx_path)], workers))
+
+
+# ---------------- Cleaning ----------------
+def fill_rows(df):
+    df = df.copy()
+    df.iloc[:, 1:] = fill_directional_average(df.iloc[:, 1:].to_numpy(dtype=float))
+    return df
+
+
+# Full cleaning of the raw frames: gap fill, USD conversion, gap fill of USD,
+# and removal of the countries with no USD value at all
+def clean_panels(raw_nfa, raw_fx):
+    df_nfa = fill_rows(raw_nfa)
+    df_fx = fill_rows(raw_fx)
+    df_usd, unmatched_countries = convert_nfa_to_usd(df_nfa, df_fx)
+    df_usd = fill_rows(df_usd)
+    df_usd = df_usd.dropna(subset=df_usd.columns[1:], how='all').reset_index(drop=True)
+    return df_nfa, df_fx, df_usd, unmatched_countries
+
+
+# ---------------- Incremental update ----------------
+# Countries whose raw row is new, differs from the previous vintage or was removed
+def changed_countries(old_raw, new_raw):
+    old = old_raw.set_index("Country")
+    new = new_raw.set_index("Country")
+    common = new.index.intersection(old.index)
+    a = new.loc[common].to_numpy(dtype=float)
+    b = old.loc[common].to_numpy(dtype=float)
+    differs = ~((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+    return set(common[differs]) | set(new.index.difference(old.index)) | set(old.index.difference(new.index))
+
+
+# Cleaned rows for `df`'s countries: `changed` ones recomputed from `raw`, the rest
+# copied from `previous`. Row order follows `raw`.
+def _merge_rows(raw, previous, changed, recompute):
+    is_changed = raw["Country"].isin(changed).to_numpy()
+    out = raw.copy()
+    if is_changed.any():
+        out.loc[is_changed, out.columns[1:]] = recompute(raw[is_changed]).iloc[:, 1:].to_numpy()
+    if (~is_changed).any():
+        kept = previous.set_index("Country").reindex(raw.loc[~is_changed, "Country"])
+        out.loc[~is_changed, out.columns[1:]] = kept.to_numpy()
+    return out
+
+
+# previous: (df_nfa, df_fx, df_usd, raw_nfa, raw_fx) of the last published version.
+# Only the countries whose NFA or FX rows changed are gap-filled and converted
+# again; everything else is reused. Returns None when an incremental update is not
+# possible (different year columns or duplicated country names); the caller then
+# cleans everything.
+def update_panels(previous, raw_nfa, raw_fx):
+    prev_nfa, prev_fx, prev_usd, prev_raw_nfa, prev_raw_fx = previous
+    if list(raw_nfa.columns) != list(prev_raw_nfa.columns) or list(raw_fx.columns) != list(prev_raw_fx.columns):
+        return None
+    for df in (raw_nfa, raw_fx, prev_raw_nfa, prev_raw_fx):
+        if df["Country"].duplicated().any():
+            return None
+
+    nfa_changed = changed_countries(prev_raw_nfa, raw_nfa)
+    fx_changed = changed_countries(prev_raw_fx, raw_fx)
+    df_nfa = _merge_rows(raw_nfa, prev_nfa, nfa_changed, fill_rows)
+    df_fx = _merge_rows(raw_fx, prev_fx, fx_changed, fill_rows)
+
+    # A USD row depends on the country's NFA row and FX row only. It exists only
+    # while both do: a country removed from either file loses its USD row, as in
+    # a full clean (its previous row is never reused).
+    usd_changed = nfa_changed | fx_changed
+    usd_rows = df_nfa.loc[df_nfa["Country"].isin(raw_fx["Country"]), ["Country"]].reset_index(drop=True)
+    usd_rows[list(df_nfa.columns[1:])] = np.nan
+
+    def convert(nfa_subset):
+        usd, _ = convert_nfa_to_usd(df_nfa[df_nfa["Country"].isin(nfa_subset["Country"])], df_fx)
+        return fill_rows(usd)
+
+    df_usd = _merge_rows(usd_rows, prev_usd, usd_changed, convert)
+    df_usd = df_usd.dropna(subset=df_usd.columns[1:], how='all').reset_index(drop=True)
+
+    changes = {"nfa_countries": sorted(nfa_changed), "fx_countries": sorted(fx_changed), "usd_rows": len(usd_changed)}
+    return df_nfa, df_fx, df_usd, changes
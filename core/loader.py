@@ -0,0 +1,68 @@
+import logging
+
+from core.cache import fingerprint, read_panels, write_panels
+from core.ingest import clean_panels, discover_sources, parse_nfa_fx, update_panels
+from core.telemetry import span
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cleaning changes, so the on-disk cache is rebuilt
+CLEANING_VERSION = 2
+
+# ---------------- To Load and Prepare NFA + FX + USD Data ----------------
+
+# Version of the data currently in ./data (the cache key of its cleaned panels)
+def current_data_version():
+    return fingerprint(discover_sources(), CLEANING_VERSION)
+
+
+# Returns (data_version, (df_nfa, df_fx, df_usd, raw_nfa, raw_fx)).
+# `previous` returns the same 5-tuple for the version already loaded; when
+# given, a new vintage only re-cleans the countries whose rows changed. It is
+# only called on a cache miss, as building the tuple can cost a full clean
+# (DataSnapshot.frames in core/store.py).
+def load_versioned_data(previous=None):
+    sources = discover_sources()
+
+    # --- Reuse the cleaned panels from the on-disk cache when the sources are unchanged
+    cache_key = fingerprint(sources, CLEANING_VERSION)
+    with span("data.cache_read"):
+        cached = read_panels(cache_key)
+    if cached is not None:
+        return cache_key, cached
+
+    frames = clean_nfa_fx_usd_data(*sources, previous=previous() if previous is not None else None)
+    try:
+        with span("data.cache_write"):
+            write_panels(cache_key, frames)
+    except OSError as e:
+        # A read-only data folder only costs us the cache, not the app
+        logger.warning("Could not write the data cache: %s", e)
+    return cache_key, frames
+
+
+def load_nfa_fx_usd_data():
+    return load_versioned_data()[1][:3]
+
+
+def clean_nfa_fx_usd_data(nfa_path, fx_path, previous=None):
+    # --- Load NFA Excel file (Net Foreign Assets by Country) and FX CSV (exchange rates)
+    with span("data.parse"):
+        raw_nfa, raw_fx = parse_nfa_fx(nfa_path, fx_path)
+
+    # --- Only the changed countries when the previous version is at hand
+    if previous is not None:
+        with span("data.update"):
+            updated = update_panels(previous, raw_nfa, raw_fx)
+        if updated is not None:
+            df_nfa, df_fx, df_usd, changes = updated
+            logger.info("Incremental update: %d NFA rows, %d FX rows, %d USD rows recomputed",
+                        len(changes["nfa_countries"]), len(changes["fx_countries"]), changes["usd_rows"])
+            return df_nfa, df_fx, df_usd, raw_nfa, raw_fx
+
+    # --- Full cleaning: fill gaps, convert to USD, fill USD gaps
+    with span("data.clean"):
+        df_nfa, df_fx, df_usd, unmatched_countries = clean_panels(raw_nfa, raw_fx)
+    if unmatched_countries:
+        logger.info("No FX rate for %d countries: %s", len(unmatched_countries), ", ".join(unmatched_countries))
+    return df_nfa, df_fx, df_usd, raw_nfa, raw_fx
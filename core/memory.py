@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# ---------------- Compact in-memory representation ----------------
+# Every session of a process shares one snapshot (core/store.py), so its size
+# is the per-worker footprint. Two things keep it small:
+#
+#   - Country columns are categorical with one dtype shared by all frames: the
+#     names are stored once and each row holds an int16 code.
+#   - Values can be held as float32 (SINGOFIN_FLOAT32=1). float32 keeps 24
+#     significant bits, so every stored value is within a relative error of
+#     2**-24 (about 6e-8, i.e. 7 significant digits) of the float64 value:
+#     1,000,000 (millions of local currency) is kept to within 0.06.
+#     Computations (filling, risk, forecasts, simulations) upcast to float64,
+#     so only the stored values are rounded.
+#     The default stays float64, which matches the cleaned data exactly.
+#
+# The raw frames kept for diffing the next vintage keep float64 values, so an
+# unchanged country is never seen as changed because of the rounding. With
+# float32 values, the cleaned rows an incremental update reuses are rebuilt
+# from them (DataSnapshot.frames), so the next version is not rounded either.
+
+FLOAT32 = os.environ.get("SINGOFIN_FLOAT32", "0").lower() in ("1", "true", "yes", "on")
+VALUE_DTYPE = np.float32 if FLOAT32 else np.float64
+FLOAT32_RELATIVE_ERROR = 2.0 ** -24
+
+
+# One categorical dtype covering the countries of all the given frames
+def country_dtype(*frames):
+    names = set()
+    for df in frames:
+        names.update(df["Country"].dropna())
+    return pd.CategoricalDtype(sorted(names))
+
+
+def compact_frame(df, countries, value_dtype=None):
+    dtypes = {"Country": countries}
+    if value_dtype is not None:
+        dtypes.update({c: value_dtype for c in df.columns[1:]})
+    return df.astype(dtypes)
+
+
+# Back to the layout the ingest code works on (object Country, float64 values)
+def expand_frame(df):
+    return df.astype({"Country": object, **{c: np.float64 for c in df.columns[1:]}})
+
+
+# ---------------- Memory accounting ----------------
+# Categorical columns count their codes only: the categories are shared by all
+# frames and reported once, by the caller.
+def nbytes(obj):
+    if isinstance(obj, pd.DataFrame):
+        return sum(nbytes(obj[c]) for c in obj.columns) + int(obj.index.memory_usage(deep=True))
+    if isinstance(obj, pd.Series) and isinstance(obj.dtype, pd.CategoricalDtype):
+        return int(obj.array.codes.nbytes)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    return 0
+
+
+# One row per named object: name, shape, value dtype and bytes
+def memory_report(objects):
+    rows = []
+    for name, obj in objects.items():
+        if isinstance(obj, pd.DataFrame):
+            dtype = ", ".join(sorted({str(t) for t in obj.dtypes}))
+        else:
+            dtype = str(getattr(obj, "dtype", ""))
+        rows.append({"name": name, "shape": "x".join(map(str, getattr(obj, "shape", ()))),
+                     "dtype": dtype, "bytes": nbytes(obj)})
+    return pd.DataFrame(rows, columns=["name", "shape", "dtype", "bytes"])
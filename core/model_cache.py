@@ -0,0 +1,86 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+# ---------------- Memoized fitted models and forecasts ----------------
+# Bounded LRU cache shared by every session of the process. Keys are
+# (country, unit, method, hyperparameters, data version), so a new data
+# version or a different configuration never returns a stale model. The size
+# of each entry is measured once, by pickling it, and the least recently used
+# entries are evicted until the total fits under max_bytes.
+
+DEFAULT_MAX_MB = float(os.environ.get("SINGOFIN_MODEL_CACHE_MB", 256))
+
+
+# Parameter values are compared by repr, so NaN defaults (XGBoost's `missing`) still match
+def model_cache_key(country, unit, method, params, version):
+    return (country, unit, method, tuple(sorted((k, repr(v)) for k, v in params.items())), version)
+
+
+class ModelCache:
+    def __init__(self, max_bytes=int(DEFAULT_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (value, size in bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            size = 0
+        if size > self.max_bytes:
+            return # Would evict everything else and still not fit
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    # The computation runs outside the lock so a slow fit never blocks other
+    # sessions; two sessions missing the same key at once both fit, last one wins.
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_model_cache = ModelCache()
+
+
+def get_model_cache():
+    return _model_cache
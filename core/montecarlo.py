@@ -0,0 +1,210 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# ---------------- Monte Carlo simulation of future NFA paths ----------------
+# Each country's future is simulated from its own history of year-over-year
+# changes (absolute changes, so negative NFA positions are handled):
+#   - "bootstrap": each step resamples one of the observed YoY changes
+#   - "normal": each step is drawn from N(mean, std) of the observed changes
+# Paths start from the latest observed value. All countries are simulated
+# together as one (countries x paths x horizon) array, in chunks of paths so
+# memory stays bounded however many paths are requested. Every chunk has its
+# own child seed (SeedSequence.spawn), so results only depend on `seed` and
+# `chunk_size`, not on the number of workers.
+#
+# Per country the simulation reports:
+#   - loss_probability: share of paths ending below the latest value, in %
+#   - var_95: 5th percentile of the simulated value at the horizon, over all
+#     paths: each chunk keeps its lowest values, enough to hold the pooled
+#     percentile, and the chunks' tails are merged
+#   - prob_high_risk: share of paths whose volatility (std / mean over history
+#     plus simulated years, as on the prediction page) exceeds `threshold`
+# with standard errors (binomial for the probabilities, batch means across
+# chunks for VaR) and the running estimates after each chunk as a
+# convergence trace.
+
+MAX_CHUNK_VALUES = 4_000_000 # ~32 MB of float64 per simulated chunk
+
+
+class SimulationResult:
+    def __init__(self, summary, convergence):
+        self.summary = summary # one row per country
+        self.convergence = convergence # running estimates after each chunk (long format)
+
+
+def _history_stats(values):
+    observed = ~np.isnan(values)
+    changes = np.diff(values, axis=1)
+    valid_changes = ~np.isnan(changes)
+
+    # Observed changes packed to the left of each row, for index-based resampling
+    order = np.argsort(~valid_changes, axis=1, kind="stable")
+    packed_changes = np.take_along_axis(changes, order, axis=1)
+    change_count = valid_changes.sum(axis=1)
+
+    last_idx = values.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    last_value = np.where(observed.any(axis=1), values[np.arange(len(values)), last_idx], np.nan)
+
+    # History shifted by its mean, to keep the running variance numerically stable
+    shift = np.nanmean(np.where(observed.any(axis=1, keepdims=True), values, 0.0), axis=1)
+    centered = np.where(observed, values - shift[:, None], 0.0)
+    with np.errstate(invalid="ignore"):
+        change_mean = np.nanmean(np.where(valid_changes, changes, np.nan), axis=1)
+        change_std = np.nanstd(np.where(valid_changes, changes, np.nan), axis=1)
+
+    return {
+        "packed_changes": packed_changes,
+        "change_count": change_count,
+        "change_mean": change_mean,
+        "change_std": change_std,
+        "last_value": last_value,
+        "shift": shift,
+        "hist_n": observed.sum(axis=1),
+        "hist_sum": centered.sum(axis=1),
+        "hist_sumsq": (centered ** 2).sum(axis=1),
+    }
+
+
+def _simulate_chunk(stats, n_paths, horizon, method, threshold, tail_size, seed_seq):
+    rng = np.random.default_rng(seed_seq)
+    n_countries, width = stats["packed_changes"].shape
+    shape = (n_countries, n_paths, horizon)
+
+    if method == "bootstrap":
+        picks = (rng.random(shape) * stats["change_count"][:, None, None]).astype(np.int64)
+        flat_idx = picks + (np.arange(n_countries) * width)[:, None, None]
+        steps = stats["packed_changes"].ravel()[flat_idx]
+        steps[stats["change_count"] == 0] = np.nan
+    elif method == "normal":
+        steps = rng.standard_normal(shape)
+        steps *= stats["change_std"][:, None, None]
+        steps += stats["change_mean"][:, None, None]
+    else:
+        raise ValueError(f"Unknown simulation method: {method}")
+
+    paths = np.cumsum(steps, axis=2)
+    paths += stats["last_value"][:, None, None]
+    final_value = paths[:, :, -1]
+
+    loss_count = (final_value < stats["last_value"][:, None]).sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        var_95 = np.percentile(final_value, 5, axis=1)
+    # Lowest `tail_size` final values per country, sorted (NaN last)
+    if tail_size < n_paths:
+        tail = np.sort(np.partition(final_value, tail_size - 1, axis=1)[:, :tail_size], axis=1)
+    else:
+        tail = np.sort(final_value, axis=1)
+
+    # Volatility of history + simulated years for each path, from running sums
+    centered = paths - stats["shift"][:, None, None]
+    n = stats["hist_n"][:, None] + horizon
+    total = stats["hist_sum"][:, None] + centered.sum(axis=2)
+    total_sq = stats["hist_sumsq"][:, None] + (centered ** 2).sum(axis=2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        centered_mean = total / n
+        std = np.sqrt(np.maximum(total_sq / n - centered_mean ** 2, 0.0))
+        mean = centered_mean + stats["shift"][:, None]
+        volatility = np.where(mean != 0, std / mean, 0.0)
+    high_risk_count = (volatility > threshold).sum(axis=1)
+
+    return n_paths, loss_count, var_95, high_risk_count, tail
+
+
+# Index of the lower of the two order statistics np.percentile interpolates
+# between for the q-th percentile of n values
+def _percentile_rank(n, q):
+    return int(np.floor((n - 1) * q / 100))
+
+
+# q-th percentile of n values per row (as np.percentile, linear interpolation)
+# from each row's lowest values, sorted
+def _percentile_from_tail(tail, n, q):
+    position = (n - 1) * q / 100
+    lower = _percentile_rank(n, q)
+    upper = min(lower + 1, n - 1)
+    return tail[:, lower] + (position - lower) * (tail[:, upper] - tail[:, lower])
+
+
+# df: a Country column followed by year columns (df_nfa or df_usd)
+def simulate_risk(df, horizon=3, n_paths=10_000, method="bootstrap", seed=0,
+                  threshold=0.03, chunk_size=None, workers=None):
+    year_cols = list(df.columns[1:])
+    values = df[year_cols].to_numpy(dtype=float)
+    countries = df["Country"].to_numpy()
+    stats = _history_stats(values)
+
+    if chunk_size is None:
+        chunk_size = max(1, MAX_CHUNK_VALUES // max(1, len(values) * horizon))
+    chunk_sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        chunk_sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    # The pooled 5th percentile interpolates between two of the lowest values of
+    # all paths; each chunk keeps that many of its own, the most it can contribute
+    tail_size = _percentile_rank(n_paths, 5) + 2
+
+    def run(args):
+        size, seed_seq = args
+        return _simulate_chunk(stats, size, horizon, method, threshold, tail_size, seed_seq)
+
+    # NumPy releases the GIL in the heavy array work, so threads share the
+    # statistics without copying them to other processes
+    workers = workers or min(len(chunk_sizes), os.cpu_count() or 1)
+    if workers == 1:
+        chunks = list(map(run, zip(chunk_sizes, seeds)))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(run, zip(chunk_sizes, seeds)))
+
+    sizes = np.array([c[0] for c in chunks], dtype=float)
+    loss_counts = np.array([c[1] for c in chunks], dtype=float) # (chunks, countries)
+    chunk_var = np.array([c[2] for c in chunks]) # (chunks, countries), for the standard error
+    high_counts = np.array([c[3] for c in chunks], dtype=float)
+
+    paths_so_far = np.cumsum(sizes)
+    running_loss = np.cumsum(loss_counts, axis=0) / paths_so_far[:, None]
+    running_high = np.cumsum(high_counts, axis=0) / paths_so_far[:, None]
+
+    # Pooled percentile after each chunk, from the merged lowest values so far
+    running_var = np.empty((len(chunks), len(values)))
+    merged = chunks[0][4][:, :0]
+    for i, (chunk, paths) in enumerate(zip(chunks, paths_so_far.astype(int))):
+        merged = np.sort(np.concatenate([merged, chunk[4]], axis=1), axis=1)[:, :tail_size]
+        with np.errstate(invalid="ignore"):
+            running_var[i] = _percentile_from_tail(merged, paths, 5)
+
+    no_data = stats["change_count"] == 0
+    loss_p = np.where(no_data, np.nan, running_loss[-1])
+    high_p = np.where(no_data, np.nan, running_high[-1])
+    var_95 = np.where(no_data, np.nan, running_var[-1])
+
+    # Batch-means standard error of VaR needs at least two chunks
+    if len(chunks) > 1:
+        var_se = np.std(chunk_var, axis=0, ddof=1) / np.sqrt(len(chunks))
+    else:
+        var_se = np.full(len(values), np.nan)
+
+    summary = pd.DataFrame({
+        "Country": countries,
+        "loss_probability": loss_p * 100,
+        "loss_probability_se": np.sqrt(loss_p * (1 - loss_p) / n_paths) * 100,
+        "var_95": var_95,
+        "var_95_se": np.where(no_data, np.nan, var_se),
+        "prob_high_risk": high_p * 100,
+        "prob_high_risk_se": np.sqrt(high_p * (1 - high_p) / n_paths) * 100,
+        "n_paths": n_paths,
+    })
+
+    convergence = pd.DataFrame({
+        "chunk": np.repeat(np.arange(1, len(chunks) + 1), len(values)),
+        "paths": np.repeat(paths_so_far.astype(int), len(values)),
+        "Country": np.tile(countries, len(chunks)),
+        "loss_probability": running_loss.ravel() * 100,
+        "var_95": running_var.ravel(),
+        "prob_high_risk": running_high.ravel() * 100,
+    })
+    return SimulationResult(summary, convergence)
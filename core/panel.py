@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from core.memory import VALUE_DTYPE
+
+
+# ---------------- Canonical panel store ----------------
+# One float cube of shape (countries, years, measures) holding the domestic NFA
+# ("local"), the FX rate ("fx") and the USD NFA ("usd") on the same country and
+# year axes. Countries, years and measures each have a position lookup, so a
+# (year, measure) cross-section or a (country, measure) series is a plain
+# NumPy view of the cube: no merge, no "2019_local"-style column names.
+#
+# The country axis is the NFA panel's. FX and USD values are aligned onto it
+# and are NaN where a country has no FX rate or no USD conversion. The cube is
+# float64, or float32 with SINGOFIN_FLOAT32=1 (see core/memory.py).
+
+MEASURES = ("local", "fx", "usd")
+UNIT_MEASURES = {"Domestic Currency": "local", "USD": "usd"}
+
+
+class Panel:
+    def __init__(self, countries, years, cube, measures=MEASURES):
+        self.countries = pd.Index(countries, name="Country")
+        self.years = [str(y) for y in years]
+        self.measures = tuple(measures)
+        self.cube = cube
+        self.cube.flags.writeable = False # shared by every session: read-only
+        self._year_pos = {y: i for i, y in enumerate(self.years)}
+        self._measure_pos = {m: i for i, m in enumerate(self.measures)}
+
+    def _country(self, country):
+        return self.countries.get_loc(country)
+
+    # All countries for one year and measure, indexed by Country
+    def year_slice(self, year, measure):
+        values = self.cube[:, self._year_pos[str(year)], self._measure_pos[measure]]
+        return pd.Series(values, index=self.countries, name=str(year), copy=False)
+
+    # One country over all years for one measure, indexed by year
+    def series(self, country, measure):
+        values = self.cube[self._country(country), :, self._measure_pos[measure]]
+        return pd.Series(values, index=pd.Index(self.years, name="Year"), name=country, copy=False)
+
+    def value(self, country, year, measure):
+        return self.cube[self._country(country), self._year_pos[str(year)], self._measure_pos[measure]]
+
+    def has_year(self, year):
+        return str(year) in self._year_pos
+
+    # (countries, years) view of one measure
+    def matrix(self, measure):
+        return self.cube[:, :, self._measure_pos[measure]]
+
+    # Countries with at least one value for this measure
+    def countries_with_data(self, measure):
+        return self.countries[~np.isnan(self.matrix(measure)).all(axis=1)]
+
+    # Wide frame (Country + year columns) for code that works on frames,
+    # without the countries that have no data for this measure
+    def frame(self, measure):
+        matrix = self.matrix(measure)
+        keep = ~np.isnan(matrix).all(axis=1)
+        df = pd.DataFrame(matrix[keep], columns=self.years)
+        df.insert(0, "Country", self.countries[keep].to_numpy())
+        return df
+
+
+def _align(df, countries, years):
+    aligned = df.drop_duplicates(subset="Country").set_index("Country")
+    return aligned.reindex(index=countries, columns=years).to_numpy(dtype=float)
+
+
+def build_panel(df_nfa, df_fx, df_usd, dtype=VALUE_DTYPE):
+    countries = df_nfa["Country"].drop_duplicates().to_numpy(dtype=object)
+    years = [str(y) for y in df_nfa.columns[1:]]
+    cube = np.empty((len(countries), len(years), len(MEASURES)), dtype=dtype)
+    for i, df in enumerate((df_nfa, df_fx, df_usd)):
+        cube[:, :, i] = _align(df, countries, years)
+    return Panel(countries, years, cube)
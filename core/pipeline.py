@@ -0,0 +1,208 @@
+import os
+import time
+
+from core.backtest import backtest, best_models, summarize_backtest
+from core.cache import artifact_path, artifact_stamp, read_artifact, write_artifact
+from core.forecast import MAX_HORIZON, METHODS, batch_forecast, save_forecast_table
+from core.montecarlo import simulate_risk
+from core.panel import UNIT_MEASURES
+from core.risk import compute_risk_metrics
+from core.store import DataStore
+from core.tuning import TUNED_METHODS, tune, tuned_params
+
+
+# ---------------- Headless pipeline ----------------
+# Everything the pages show that is costly to compute, as versioned artifacts
+# under data/.cache (see core/cache.py):
+#   risk_<measure>/<version>                 cross-country risk table
+#   simulation_<measure>_<h>y/<version>      Monte Carlo risk summary for horizon h
+#   tuning/<version>                         tuned hyperparameters per country and method (core/tuning.py)
+#   forecasts/<version>                      batch forecast table (core/forecast.py)
+#   backtest/<version>                       walk-forward accuracy per country, method and horizon
+# The pages read them through the functions below, which compute the result
+# on the spot when no artifact exists (e.g. no precompute job has run for this
+# data version yet); tuning and the backtest are too costly for that and are
+# only read. Forecasts use the tuned hyperparameters when a tuning artifact
+# exists, the library defaults otherwise; the backtest then tunes the same
+# methods on the history before its first origin instead.
+# `python -m core precompute` writes all of them.
+
+SIMULATION_PATHS = 20_000
+HIGH_RISK_THRESHOLD = 0.03 # Volatility above which a simulated path counts as high risk
+
+
+def _risk_kind(measure):
+    return f"risk_{measure}"
+
+
+def _simulation_kind(measure, horizon):
+    return f"simulation_{measure}_{horizon}y"
+
+
+def compute_risk_table(data, measure):
+    return compute_risk_metrics(data.panel.frame(measure))
+
+
+def compute_simulated_risk(data, measure, horizon):
+    return simulate_risk(data.panel.frame(measure), horizon=horizon, n_paths=SIMULATION_PATHS,
+                         seed=0, threshold=HIGH_RISK_THRESHOLD).summary
+
+
+# `data` is a DataSnapshot (core/store.py)
+def risk_table(data, measure):
+    stored = read_artifact(_risk_kind(measure), data.version)
+    return stored if stored is not None else compute_risk_table(data, measure)
+
+
+def simulated_risk(data, measure, horizon):
+    stored = read_artifact(_simulation_kind(measure, horizon), data.version)
+    return stored if stored is not None else compute_simulated_risk(data, measure, horizon)
+
+
+# Stamps (core/cache.py) of the artifacts behind the two functions above, for
+# the pages' cache keys: a result computed before the artifact was written is
+# then replaced by the artifact
+def risk_table_stamp(data, measure):
+    return artifact_stamp(_risk_kind(measure), data.version)
+
+
+def simulated_risk_stamp(data, measure, horizon):
+    return artifact_stamp(_simulation_kind(measure, horizon), data.version)
+
+
+# Write the artifact unless it exists, so the next page read is a file read
+# (the background warm-up of core/warmup.py); return its path
+def _ensure_artifact(kind, version, compute):
+    path = artifact_path(kind, version)
+    if not os.path.exists(path):
+        write_artifact(kind, version, compute())
+    return path
+
+
+def ensure_risk_table(data, measure):
+    return _ensure_artifact(_risk_kind(measure), data.version, lambda: compute_risk_table(data, measure))
+
+
+def ensure_simulated_risk(data, measure, horizon):
+    return _ensure_artifact(_simulation_kind(measure, horizon), data.version,
+                            lambda: compute_simulated_risk(data, measure, horizon))
+
+
+# Frames the batch forecast runs on, keyed by the unit labels of the pages
+def forecast_panels(data):
+    return {unit: data.panel.frame(measure) for unit, measure in UNIT_MEASURES.items()}
+
+
+def compute_tuning(data, methods=TUNED_METHODS, workers=None):
+    return tune(forecast_panels(data), methods, workers=workers)
+
+
+# {(country, unit, method): params}, empty without a tuning artifact
+def tuned_params_map(data):
+    return tuned_params(read_artifact("tuning", data.version))
+
+
+# Methods with a tuning artifact are backtested with hyperparameters tuned
+# before the first origin (core/backtest.py), not with the stored ones, which
+# were chosen on the years the backtest scores.
+def compute_backtest(data, methods=METHODS, horizon=MAX_HORIZON, window_size=5, workers=None):
+    tuned_methods = {method for _, _, method in tuned_params_map(data)}
+    errors = backtest(forecast_panels(data), methods, horizon, window_size, workers=workers, tuned_methods=tuned_methods)
+    return summarize_backtest(errors)
+
+
+# Backtest summary (core/backtest.py) of this data version, or None if not precomputed
+def backtest_summary(data):
+    return read_artifact("backtest", data.version)
+
+
+# {(country, unit): method with the lowest backtest MAE over horizons 1 to
+# max_horizon (all of them if None)}, empty without a backtest
+def best_model_map(data, max_horizon=None):
+    summary = backtest_summary(data)
+    if summary is None:
+        return {}
+    best = best_models(summary, max_horizon)
+    return dict(zip(zip(best["country"], best["unit"]), best["method"]))
+
+
+# ---------------- Precompute job ----------------
+# Loads (and caches) the current data version, then writes every missing
+# artifact. Existing artifacts of the same version are kept unless `force`,
+# unless the tuning they were fitted with has just been rewritten, or unless
+# they do not cover this run's methods and horizon (e.g. written by a run with
+# fewer --method); the backtest's Moving Average window is not recorded, so a
+# different --window needs --force. An empty result is not written, so it
+# never reads as up to date later.
+# Returns {artifact name: path}.
+def precompute(methods=METHODS, horizon=MAX_HORIZON, window_size=5, workers=None,
+               simulate=True, forecast=True, evaluate=True, tuning=True, force=False, log=print):
+    start = time.perf_counter()
+    store = DataStore(poll_seconds=0)
+    data = store.get()
+    if data is None:
+        raise store.error or RuntimeError("Data could not be loaded.")
+    log(f"Data version {data.version}: {len(data.df_nfa)} NFA, {len(data.df_fx)} FX, {len(data.df_usd)} USD rows")
+
+    written = {}
+
+    # covers(stored frame) says whether an existing artifact serves this run.
+    # Returns whether the artifact was (re)computed.
+    def produce(kind, compute, save=None, stale=False, covers=None):
+        path = artifact_path(kind, data.version)
+        if not (force or stale) and os.path.exists(path):
+            if covers is None or covers(read_artifact(kind, data.version)):
+                log(f"  {kind:<28} up to date")
+                written[kind] = path
+                return False
+            log(f"  {kind:<28} does not cover this run, recomputing")
+        t = time.perf_counter()
+        frame = compute()
+        if frame.empty:
+            log(f"  {kind:<28} empty, not written")
+            return False
+        written[kind] = save(frame) if save else write_artifact(kind, data.version, frame)
+        log(f"  {kind:<28} {len(frame):>8} rows  {time.perf_counter() - t:7.2f}s")
+        return True
+
+    def has_methods(frame, wanted):
+        return frame is not None and set(wanted) <= set(frame["method"])
+
+    measures = sorted(set(UNIT_MEASURES.values()))
+    for measure in measures:
+        produce(_risk_kind(measure), lambda: compute_risk_table(data, measure))
+    if simulate:
+        for measure in measures:
+            for h in range(1, horizon + 1):
+                produce(_simulation_kind(measure, h), lambda h=h: compute_simulated_risk(data, measure, h))
+    # Tuning first: the forecasts and the backtest below use its hyperparameters
+    tuned_methods = [m for m in methods if m in TUNED_METHODS]
+    retuned = tuning and bool(tuned_methods) and produce(
+        "tuning", lambda: compute_tuning(data, tuned_methods, workers),
+        covers=lambda table: has_methods(table, tuned_methods))
+    if forecast:
+        produce("forecasts",
+                lambda: batch_forecast(forecast_panels(data), methods, horizon, window_size, workers,
+                                       tuned=tuned_params_map(data)),
+                lambda table: save_forecast_table(table, data.version), stale=retuned,
+                covers=lambda table: has_methods(table, methods)
+                and table.groupby(["country", "unit", "method", "window"]).size().max() >= horizon
+                and ("Moving Average" not in methods or window_size in set(table["window"])))
+    if evaluate:
+        produce("backtest", lambda: compute_backtest(data, methods, horizon, window_size, workers), stale=retuned,
+                covers=lambda summary: has_methods(summary, methods) and summary["horizon"].max() >= horizon)
+
+    log(f"Done in {time.perf_counter() - start:.1f}s")
+    return written
+
+
+def artifact_kinds(horizon=MAX_HORIZON):
+    measures = sorted(set(UNIT_MEASURES.values()))
+    kinds = [_risk_kind(m) for m in measures]
+    kinds += [_simulation_kind(m, h) for m in measures for h in range(1, horizon + 1)]
+    return kinds + ["tuning", "forecasts", "backtest"]
+
+
+# {artifact name: whether it exists} for one data version
+def artifact_status(version, horizon=MAX_HORIZON):
+    return {kind: os.path.exists(artifact_path(kind, version)) for kind in artifact_kinds(horizon)}
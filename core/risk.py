@@ -0,0 +1,67 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+RISK_METRICS = ["var_95", "exposure", "volatility", "loss_probability"]
+
+
+# ---------- Risk bands on volatility (std / mean) ----------
+def get_risk_level(val):
+    if val < 0.02: return "Low", "green"
+    elif val < 0.05: return "Moderate", "orange"
+    else: return "High", "red"
+
+
+# Year-over-year % change for every row of a (countries x years) array.
+# Column j is the change from year j to year j+1; NaN where either side is missing.
+def pct_change_matrix(values):
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (values[:, 1:] / values[:, :-1] - 1) * 100
+
+
+# ---------------- Cross-country risk metrics ----------------
+# Same definitions as the single-country view of the Analysis page, for the
+# whole panel in one NaN-aware pass:
+#   - var_95: 5th percentile of the observed values
+#   - exposure: latest observed value
+#   - volatility: std / mean of the observed values (0 when the mean is 0)
+#   - loss_probability: share of YoY changes below zero, in %
+# A country with no observations gets NaN everywhere.
+def compute_risk_metrics(df):
+    year_cols = list(df.columns[1:])
+    values = df[year_cols].to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+    has_data = observed.any(axis=1)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # all-NaN rows
+        var_95 = np.nanpercentile(values, 5, axis=1)
+        mean = np.nanmean(values, axis=1)
+        std = np.nanstd(values, axis=1)
+
+    # Latest observed value: position of the last True in each row of `observed`
+    last_idx = values.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    exposure = np.where(has_data, values[np.arange(len(values)), last_idx], np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volatility = np.where(mean != 0, std / mean, 0.0)
+    volatility = np.where(has_data, volatility, np.nan)
+
+    pct_change = pct_change_matrix(values)
+    valid_changes = ~np.isnan(pct_change)
+    loss_count = (pct_change < 0).sum(axis=1)
+    total_count = valid_changes.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loss_probability = np.where(total_count > 0, loss_count / total_count * 100, np.nan)
+
+    metrics = pd.DataFrame({
+        "Country": df["Country"].to_numpy(),
+        "var_95": var_95,
+        "exposure": exposure,
+        "volatility": volatility,
+        "loss_probability": loss_probability,
+    })
+    metrics["risk_level"] = [get_risk_level(v)[0] if not np.isnan(v) else None for v in volatility]
+    return metrics
@@ -0,0 +1,135 @@
+import contextlib
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- Background task scheduler ----------------
+# Runs low-priority work (cache warming, see core/warmup.py) on a few daemon
+# threads of this process, without getting in the way of the pages:
+#   priority      lower numbers first, first in first out within a priority
+#   backpressure  at most max_queued tasks wait (submit refuses the rest); a
+#                 worker only starts a task while no page rerun is in progress
+#                 (the app marks reruns with interactive()) and pauses
+#                 yield_seconds after each task
+#   cancellation  queued tasks of one group (e.g. an old data version) or all
+#                 of them are dropped; a running task is left to finish
+#   progress      counts per state and the tasks running now
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class Task:
+    def __init__(self, name, fn, priority, group):
+        self.name = name
+        self.fn = fn
+        self.priority = priority
+        self.group = group
+        self.state = QUEUED
+        self.error = None
+        self.seconds = None
+
+
+class Scheduler:
+    def __init__(self, workers=1, max_queued=5000, yield_seconds=0.02, name="scheduler"):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.yield_seconds = yield_seconds
+        self.name = name
+        self._heap = [] # (priority, sequence, task)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = []
+        self._reruns = 0 # Page reruns in progress
+        self._counts = {QUEUED: 0, DONE: 0, FAILED: 0, CANCELLED: 0, "rejected": 0}
+
+    # Returns the queued Task, or None when the queue is full
+    def submit(self, name, fn, priority=0, group=None):
+        with self._cond:
+            if self._counts[QUEUED] >= self.max_queued:
+                self._counts["rejected"] += 1
+                return None
+            task = Task(name, fn, priority, group)
+            heapq.heappush(self._heap, (priority, next(self._sequence), task))
+            self._counts[QUEUED] += 1
+            self._start_workers()
+            self._cond.notify()
+            return task
+
+    # Drops the queued tasks of `group` (every queued task if None); returns how many
+    def cancel(self, group=None):
+        with self._cond:
+            kept, dropped = [], 0
+            for entry in self._heap:
+                task = entry[2]
+                if group is None or task.group == group:
+                    task.state = CANCELLED
+                    dropped += 1
+                else:
+                    kept.append(entry)
+            heapq.heapify(kept)
+            self._heap = kept
+            self._counts[QUEUED] -= dropped
+            self._counts[CANCELLED] += dropped
+            return dropped
+
+    # Marks a page rerun: no new task starts until it ends
+    @contextlib.contextmanager
+    def interactive(self):
+        with self._cond:
+            self._reruns += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._reruns -= 1
+                self._cond.notify_all()
+
+    def progress(self):
+        with self._cond:
+            finished = self._counts[DONE] + self._counts[FAILED]
+            return {
+                **self._counts,
+                "running": [task.name for task in self._running],
+                "finished": finished,
+                "total": finished + self._counts[QUEUED] + len(self._running),
+                "paused": self._reruns > 0,
+            }
+
+    def _start_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_task(self):
+        with self._cond:
+            while not self._heap or self._reruns > 0:
+                self._cond.wait(timeout=1.0)
+            task = heapq.heappop(self._heap)[2]
+            task.state = RUNNING
+            self._counts[QUEUED] -= 1
+            self._running.append(task)
+            return task
+
+    def _work(self):
+        while True:
+            task = self._next_task()
+            start = time.perf_counter()
+            try:
+                task.fn()
+                task.state = DONE
+            except Exception as e:
+                task.state, task.error = FAILED, e
+                logger.warning("%s task %s failed: %s", self.name, task.name, e)
+            task.seconds = time.perf_counter() - start
+            with self._cond:
+                self._running.remove(task)
+                self._counts[task.state] += 1
+            time.sleep(self.yield_seconds)
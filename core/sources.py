@@ -0,0 +1,227 @@
+import glob
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- Declared data sources ----------------
+# Every input file is described by a Source: which files (glob pattern in
+# ./data), how they are laid out, which sheet, which frequency and which
+# indicator they hold. Parsing is driven by these declarations only, so a new
+# IMF indicator or frequency is one more entry, either in DEFAULT_SOURCES or in
+# ./data/sources.json (a list of objects with the same fields), e.g.
+#
+#     [{"name": "NFA", "pattern": "Monetary_Sector_Depository_Corporat*.xlsx",
+#       "layout": "ifs_workbook", "frequency": "Q"},
+#      {"name": "CPI", "pattern": "dataset_*IMF.STA_CPI*.csv", "layout": "imf_csv",
+#       "frequency": "M", "filters": {"TYPE_OF_TRANSFORMATION": "Index"}}]
+#
+# Layouts:
+#   ifs_workbook  IMF IFS Excel download: title rows, a Country column, one column per period
+#   imf_csv       IMF data explorer CSV: metadata columns, a COUNTRY column, one column per period
+#
+# Period columns are normalized to "2015" (A), "2015Q1" (Q) and "2015M01" (M).
+
+DATA_DIR = os.environ.get("SINGOFIN_DATA_DIR", "./data")
+SOURCES_FILE = "sources.json"
+FREQUENCIES = {"A": "Annual", "Q": "Quarterly", "M": "Monthly"}
+LAYOUTS = ("ifs_workbook", "imf_csv")
+
+
+class Source:
+    def __init__(self, name, pattern, layout, frequency="A", sheet=None, skiprows=None, country_column=None,
+                 filters=None, indicator_column=None, latest_only=True, sort_countries=False, required=False,
+                 description=""):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown source layout: {layout}")
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {frequency}")
+        self.name = name # Indicator name (or prefix, with indicator_column)
+        self.pattern = pattern # Glob pattern in the data folder
+        self.layout = layout
+        self.frequency = frequency
+        self.sheet = sheet or FREQUENCIES[frequency] # Workbook sheet (IFS names its sheets by frequency)
+        self.skiprows = skiprows if skiprows is not None else (6 if layout == "ifs_workbook" else 0)
+        self.country_column = country_column or ("Country" if layout == "ifs_workbook" else "COUNTRY")
+        self.filters = filters or {} # Column -> accepted value or list of values
+        self.indicator_column = indicator_column # One indicator per distinct value of this column
+        self.latest_only = latest_only # Newest matching file only (vintages), or all of them
+        self.sort_countries = sort_countries
+        self.required = required # Missing files raise instead of being skipped
+        self.description = description
+
+    def files(self, data_dir=DATA_DIR):
+        matches = sorted(glob.glob(os.path.join(data_dir, self.pattern)), key=os.path.getmtime)
+        return matches[-1:] if self.latest_only else matches
+
+    def __repr__(self):
+        return f"Source({self.name!r}, {self.frequency}, {self.pattern!r})"
+
+
+NFA_SOURCE = Source("NFA", "Monetary_Sector_Depository_Corporat*.xlsx", "ifs_workbook", required=True,
+                    description="Net foreign assets of depository corporations, domestic currency (IMF IFS)")
+FX_SOURCE = Source("FX", "dataset_*IMF.RES_WEO*.csv", "imf_csv", sort_countries=True, required=True,
+                   description="Implied PPP conversion rate, national currency per USD (IMF WEO, PPPEX)")
+
+DEFAULT_SOURCES = [
+    NFA_SOURCE,
+    FX_SOURCE,
+    # Same IFS workbook at higher frequencies, when the download includes those sheets
+    Source("NFA", NFA_SOURCE.pattern, "ifs_workbook", frequency="Q"),
+    Source("NFA", NFA_SOURCE.pattern, "ifs_workbook", frequency="M"),
+]
+
+
+# DEFAULT_SOURCES plus the ones declared in <data_dir>/sources.json; an entry
+# with the same name and frequency as a default one replaces it
+def registered_sources(data_dir=DATA_DIR):
+    sources = {(s.name, s.frequency): s for s in DEFAULT_SOURCES}
+    path = os.path.join(data_dir, SOURCES_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            for entry in json.load(f):
+                source = Source(**entry)
+                sources[(source.name, source.frequency)] = source
+    return list(sources.values())
+
+
+# ---------------- Periods ----------------
+_QUARTER = re.compile(r"^(\d{4})[-\s]?Q([1-4])$")
+_MONTH = re.compile(r"^(\d{4})[-\s]?M?(\d{1,2})$")
+_MONTHLY_CODE = re.compile(r"^\d{4}M\d{1,2}$")
+
+
+# Normalized period label of a column header, or None if it is not a period of
+# this frequency. Annual headers may come as "2015", 2015, 2015.0 or "2015-...".
+def period_label(column, frequency):
+    text = str(column).strip()
+    if frequency == "A":
+        if _QUARTER.match(text) or _MONTHLY_CODE.match(text):
+            return None
+        if text[:4].isdigit() and (len(text) == 4 or not text[4:5].isdigit()):
+            return text[:4]
+        return None
+    match = (_QUARTER if frequency == "Q" else _MONTH).match(text)
+    if match is None:
+        return None
+    year, sub = match.group(1), int(match.group(2))
+    if frequency == "Q":
+        return f"{year}Q{sub}"
+    return f"{year}M{sub:02d}" if 1 <= sub <= 12 else None
+
+
+# ---------------- Parsing ----------------
+def read_table(source, path):
+    if source.layout == "ifs_workbook":
+        with pd.ExcelFile(path) as workbook:
+            return workbook.parse(source.sheet, skiprows=source.skiprows)
+    return pd.read_csv(path, skiprows=source.skiprows)
+
+
+def _apply_filters(df_raw, filters):
+    for column, accepted in filters.items():
+        accepted = accepted if isinstance(accepted, (list, tuple, set)) else [accepted]
+        df_raw = df_raw[df_raw[column].isin(accepted)]
+    return df_raw
+
+
+# Country column followed by one numeric column per normalized period
+def _wide(df_raw, source):
+    country_col = source.country_column if source.country_column in df_raw.columns else df_raw.columns[1]
+    periods = [(c, period_label(c, source.frequency)) for c in df_raw.columns if c != country_col]
+    periods = [(c, label) for c, label in periods if label is not None]
+    df = df_raw[[country_col] + [c for c, _ in periods]].copy()
+    df.columns = ['Country'] + [label for _, label in periods]
+    df = df[df['Country'].notna()]
+    if source.sort_countries:
+        df = df.sort_values(by='Country')
+    df = df.reset_index(drop=True)
+    for period in df.columns[1:]:
+        df[period] = pd.to_numeric(df[period], errors='coerce')
+    return df
+
+
+# One file as a wide frame (Country + periods), for sources of a single indicator
+def parse_source(source, path):
+    return _wide(_apply_filters(read_table(source, path), source.filters), source)
+
+
+# Wide frame -> long (indicator, frequency, country, period, value) rows, without gaps
+def to_long(wide, indicator, frequency):
+    values = wide.iloc[:, 1:].to_numpy(dtype=float)
+    periods = np.asarray(wide.columns[1:], dtype=object)
+    rows, cols = np.nonzero(~np.isnan(values))
+    return pd.DataFrame({
+        "indicator": indicator,
+        "frequency": frequency,
+        "country": wide["Country"].to_numpy(dtype=object)[rows],
+        "period": periods[cols],
+        "value": values[rows, cols],
+    })
+
+
+# One file as long rows; runs in a worker process. A missing sheet of an
+# optional source yields None.
+def _parse_task(task):
+    source, path = task
+    try:
+        df_raw = _apply_filters(read_table(source, path), source.filters)
+    except ValueError:
+        if source.required:
+            raise
+        return None # e.g. the workbook has no "Quarterly" sheet
+    if source.indicator_column is None:
+        return to_long(_wide(df_raw, source), source.name, source.frequency)
+    parts = [to_long(_wide(group, source), f"{source.name}{key}", source.frequency)
+             for key, group in df_raw.groupby(source.indicator_column, sort=True)]
+    return pd.concat(parts, ignore_index=True) if parts else None
+
+
+# ---------------- Parallel loading ----------------
+# Files are parsed in a pool of worker processes (Excel parsing holds the GIL),
+# so loading many files takes about as long as the slowest one plus the pool
+# start-up. Below PARALLEL_MIN_FILES the start-up costs more than it saves and
+# files are parsed in this process.
+PARALLEL_MIN_FILES = 4
+
+
+def parallel_map(fn, items, workers=None):
+    items = list(items)
+    workers = min(workers or os.cpu_count() or 1, len(items))
+    if workers <= 1 or len(items) < PARALLEL_MIN_FILES:
+        return [fn(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items))
+
+
+# Parses every file of every source into one IndicatorStore. When several files
+# give a value for the same (indicator, frequency, country, period), the most
+# recently modified file wins; a gap in a newer file keeps the older value.
+def load_sources(sources=None, data_dir=DATA_DIR, workers=None):
+    from core.indicators import IndicatorStore
+
+    sources = sources if sources is not None else registered_sources(data_dir)
+    tasks = []
+    for source in sources:
+        paths = source.files(data_dir)
+        if not paths:
+            if source.required:
+                raise FileNotFoundError(f"{source.name} file not found!")
+            continue
+        tasks += [(source, path) for path in paths]
+    tasks.sort(key=lambda task: os.path.getmtime(task[1]))
+
+    parts = []
+    for (source, path), long in zip(tasks, parallel_map(_parse_task, tasks, workers)):
+        if long is None:
+            logger.info("Skipped %s (%s): no %s sheet", os.path.basename(path), source.name, source.sheet)
+        else:
+            parts.append(long)
+    return IndicatorStore.from_long(parts)
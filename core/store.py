@@ -0,0 +1,174 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from core.countries import build_country_index, unresolved_countries
+from core.ingest import clean_panels
+from core.loader import current_data_version, load_versioned_data
+from core.memory import VALUE_DTYPE, compact_frame, country_dtype, expand_frame, memory_report
+from core.panel import build_panel
+from core.telemetry import span
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) a running app checks ./data for a new vintage
+POLL_SECONDS = float(os.environ.get("SINGOFIN_DATA_POLL_SECONDS", 30))
+# After a failed load, get() waits this long (seconds) before trying again, so
+# the several get() calls of one rerun do not each repeat the load
+RETRY_SECONDS = 5
+
+
+# ---------------- Process-wide shared data store ----------------
+# Streamlit runs every session's script on its own thread, but imported modules
+# are shared by the whole process. The store below therefore loads the panels
+# once per process and hands the same frames to every session and every page,
+# instead of each session keeping a private copy in st.session_state.
+#
+# Snapshots are read-only by convention: pages derive new frames from them
+# (merge, filter, copy) but must never modify them in place.
+#
+# New data versions: at most every POLL_SECONDS, get() checks in a background
+# thread whether the files in ./data changed. If so, the new vintage is ingested
+# incrementally (only changed countries are re-cleaned) and the new snapshot is
+# swapped in; sessions see it on their next rerun, without a restart.
+
+# Frames are stored compactly (categorical Country, optional float32 values,
+# see core/memory.py); pages read them as they are.
+class DataSnapshot:
+    def __init__(self, version, df_nfa, df_fx, df_usd, raw_nfa=None, raw_fx=None, iso_codes=None):
+        self.version = version
+        self.panel = build_panel(df_nfa, df_fx, df_usd) # Indexed (country, year, measure) cube
+        countries = country_dtype(df_nfa, df_fx, df_usd, *(df for df in (raw_nfa, raw_fx) if df is not None))
+        self.df_nfa = compact_frame(df_nfa, countries, VALUE_DTYPE) # Domestic currency data
+        self.df_fx = compact_frame(df_fx, countries, VALUE_DTYPE) # Exchange rate data
+        self.df_usd = compact_frame(df_usd, countries, VALUE_DTYPE) # Converted to USD
+        self.year_cols = df_nfa.columns[1:] # List of years
+        self.iso_codes = iso_codes or {} # Country name -> ISO alpha-3 (None if unresolved)
+        self.loaded_at = time.time()
+        # Pre-fill frames, to diff the next vintage against (values stay float64)
+        self._raw = tuple(compact_frame(df, countries) if df is not None else None for df in (raw_nfa, raw_fx))
+
+    # Frames the loader needs for an incremental update. With float32 values
+    # the stored frames are rounded, and reused rows would carry the rounding
+    # into the next version (and its float64 disk cache), so the cleaned frames
+    # are rebuilt from the float64 raw frames instead. A method, handed to the
+    # loader uncalled: it only runs when the new version is not cached.
+    def frames(self):
+        if self._raw[0] is None:
+            return None
+        raw = tuple(expand_frame(df) for df in self._raw)
+        if VALUE_DTYPE != np.float64:
+            return (*clean_panels(*raw)[:3], *raw)
+        return (*(expand_frame(df) for df in (self.df_nfa, self.df_fx, self.df_usd)), *raw)
+
+    # Bytes held by each frame of the snapshot
+    def memory_usage(self):
+        return memory_report({
+            "df_nfa": self.df_nfa, "df_fx": self.df_fx, "df_usd": self.df_usd,
+            "raw_nfa": self._raw[0], "raw_fx": self._raw[1],
+            "country names": self.df_nfa["Country"].cat.categories,
+            "panel.cube": self.panel.cube, "panel.countries": self.panel.countries,
+        })
+
+
+class DataStore:
+    def __init__(self, loader=load_versioned_data, version_probe=current_data_version, poll_seconds=POLL_SECONDS):
+        self._loader = loader
+        self._version_probe = version_probe
+        self._poll_seconds = poll_seconds
+        self._snapshot = None
+        self._error = None
+        self._failed_at = None # monotonic time of the last failed load
+        self._load_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._last_poll = time.monotonic()
+        self._polling = False
+
+    # Current snapshot, loading it on first use. Returns None (and keeps the
+    # error) if loading failed; a call after RETRY_SECONDS tries again.
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self._maybe_poll()
+            return snapshot
+        with self._load_lock:
+            # Another runner may have finished (or failed) the load while we waited
+            retry = self._failed_at is None or time.monotonic() - self._failed_at >= RETRY_SECONDS
+            if self._snapshot is None and retry:
+                self._load()
+            return self._snapshot
+
+    # Refresh hook: reloads the sources and swaps the new snapshot in atomically.
+    # Readers keep using the previous snapshot until the swap, and keep it if
+    # the reload fails; reload() then returns None and `error` says why.
+    def reload(self):
+        with self._load_lock:
+            self._error = None
+            self._load()
+            return self._snapshot if self._error is None else None
+
+    @property
+    def error(self):
+        return self._error
+
+    def _maybe_poll(self):
+        if self._poll_seconds <= 0:
+            return
+        with self._poll_lock:
+            if self._polling or time.monotonic() - self._last_poll < self._poll_seconds:
+                return
+            self._polling = True
+            self._last_poll = time.monotonic()
+        threading.Thread(target=self._reload_if_changed, name="data-poll", daemon=True).start()
+
+    def _reload_if_changed(self):
+        try:
+            snapshot = self._snapshot
+            if snapshot is None or self._version_probe() != snapshot.version:
+                logger.info("New data version found in ./data, reloading")
+                self.reload()
+        except Exception:
+            logger.exception("Checking ./data for a new version failed")
+        finally:
+            with self._poll_lock:
+                self._polling = False
+
+    def _load(self):
+        previous = self._snapshot.frames if self._snapshot is not None else None # Called by the loader if needed
+        try:
+            with span("data.load"):
+                version, (df_nfa, df_fx, df_usd, raw_nfa, raw_fx) = self._loader(previous=previous)
+        except Exception as e:
+            logger.exception("Data load failed")
+            self._error = e
+            self._failed_at = time.monotonic()
+            return
+        self._failed_at = None
+        # Resolved once per load, so pages only do a dictionary join
+        names = list(dict.fromkeys([*df_nfa["Country"], *df_fx["Country"], *df_usd["Country"]]))
+        try:
+            with span("data.country_index"):
+                iso_codes = build_country_index(names)
+        except Exception:
+            logger.exception("Country ISO resolution failed")
+            iso_codes = {}
+        unresolved = unresolved_countries(iso_codes)
+        if unresolved:
+            logger.info("No ISO code for %d countries (left off the map): %s", len(unresolved), ", ".join(unresolved))
+        with span("data.build_panel"):
+            self._snapshot = DataSnapshot(version, df_nfa, df_fx, df_usd, raw_nfa, raw_fx, iso_codes)
+
+
+_store = DataStore()
+
+
+def get_store():
+    return _store
+
+
+# Shortcut used by the pages
+def get_data():
+    return _store.get()
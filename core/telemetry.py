@@ -0,0 +1,230 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from core.cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- Timing spans and rerun latency ----------------
+# Off unless SINGOFIN_TELEMETRY=1. When off, span() returns one shared no-op
+# context manager and rerun() does the same, so instrumented code pays a global
+# lookup and a function call per span.
+#
+# When on:
+#   - span("name") times a stage; the time goes into a rolling window per span
+#     name and into the current rerun's record (spans are collected per thread,
+#     and Streamlit runs each rerun on its own thread)
+#   - rerun(page, session, widgets) wraps one script run; its record (page,
+#     session, widget state, total latency, spans) is appended to a JSONL file
+#   - summary() gives rolling p50 / p90 / p99 per span and per page
+#   - prometheus_text() renders the same as Prometheus text format, served on
+#     SINGOFIN_METRICS_PORT by start_metrics_server()
+
+ENABLED = os.environ.get("SINGOFIN_TELEMETRY", "0").lower() in ("1", "true", "yes", "on")
+LOG_PATH = os.environ.get("SINGOFIN_TELEMETRY_FILE", os.path.join(CACHE_DIR, "telemetry.jsonl"))
+WINDOW = int(os.environ.get("SINGOFIN_TELEMETRY_WINDOW", 1000)) # Samples kept per series
+QUANTILES = (0.5, 0.9, 0.99)
+
+_NULL = contextlib.nullcontext()
+_local = threading.local()
+
+
+class Recorder:
+    def __init__(self, window=WINDOW):
+        self._window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self._window)) # (kind, name) -> seconds
+        self._totals = defaultdict(lambda: [0, 0.0]) # (kind, name) -> [count, sum] since start
+        self._recent = deque(maxlen=50) # Latest rerun records, for the debug panel
+        self._lock = threading.Lock()
+
+    def observe(self, kind, name, seconds):
+        with self._lock:
+            self._samples[(kind, name)].append(seconds)
+            totals = self._totals[(kind, name)]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def add_rerun(self, record):
+        self.observe("rerun", record["page"], record["seconds"])
+        with self._lock:
+            self._recent.append(record)
+
+    def recent(self):
+        with self._lock:
+            return list(self._recent)
+
+    # {(kind, name): {"count", "sum", "p50", "p90", "p99", "max"}}; percentiles
+    # cover the rolling window, count and sum the whole process lifetime
+    def summary(self):
+        with self._lock:
+            items = [(key, np.array(samples), tuple(self._totals[key])) for key, samples in self._samples.items()]
+        out = {}
+        for key, samples, (count, total) in sorted(items):
+            row = {"count": count, "sum": total, "max": float(samples.max())}
+            for q, value in zip(QUANTILES, np.quantile(samples, QUANTILES)):
+                row[f"p{int(q * 100)}"] = float(value)
+            out[key] = row
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._recent.clear()
+
+
+_recorder = Recorder()
+
+
+def get_recorder():
+    return _recorder
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        _recorder.observe("span", self.name, seconds)
+        spans = getattr(_local, "spans", None)
+        if spans is not None:
+            spans.append({"name": self.name, "seconds": round(seconds, 6)})
+        return False
+
+
+def span(name):
+    if not ENABLED:
+        return _NULL
+    return _Span(name)
+
+
+# Widget values that go into the JSONL record: scalars only, long strings cut
+def _widget_state(widgets):
+    state = {}
+    for key, value in (widgets or {}).items():
+        if isinstance(value, (bool, int, float)) or value is None:
+            state[str(key)] = value
+        elif isinstance(value, str):
+            state[str(key)] = value[:100]
+    return state
+
+
+@contextlib.contextmanager
+def _rerun(page, session, widgets):
+    _local.spans = []
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = {
+            "ts": round(time.time(), 3),
+            "page": page,
+            "session": session,
+            "seconds": round(time.perf_counter() - start, 6),
+            "widgets": _widget_state(widgets),
+            "spans": _local.spans,
+        }
+        _local.spans = None
+        _recorder.add_rerun(record)
+        write_record(record)
+
+
+def rerun(page, session=None, widgets=None):
+    if not ENABLED:
+        return _NULL
+    return _rerun(page, session, widgets)
+
+
+# ---------------- Exports ----------------
+_write_lock = threading.Lock()
+_write_failed = False
+
+
+# Telemetry never breaks a page: a failed write is logged once and the record dropped
+def write_record(record, path=None):
+    global _write_failed
+    path = path or LOG_PATH
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+    except OSError as e:
+        if not _write_failed:
+            _write_failed = True
+            logger.warning("Could not write telemetry to %s: %s", path, e)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def prometheus_text(recorder=None):
+    summary = (recorder or _recorder).summary()
+    metrics = {"span": ("singofin_span_seconds", "span", "Duration of named pipeline stages"),
+               "rerun": ("singofin_rerun_seconds", "page", "Latency of a full page rerun")}
+    lines = []
+    for kind, (metric, label, help_text) in metrics.items():
+        rows = [(name, row) for (k, name), row in summary.items() if k == kind]
+        if not rows:
+            continue
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+        for name, row in rows:
+            for q in QUANTILES:
+                lines.append(f'{metric}{{{label}="{_label(name)}",quantile="{q}"}} {row[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{metric}_sum{{{label}="{_label(name)}"}} {row["sum"]:.6f}')
+            lines.append(f'{metric}_count{{{label}="{_label(name)}"}} {row["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Serves GET /metrics on a background thread; started once per process. Returns
+# the server, or None when telemetry is off, no port is configured or the port is taken.
+def start_metrics_server(port=None, host="127.0.0.1"):
+    global _server
+    port = port if port is not None else int(os.environ.get("SINGOFIN_METRICS_PORT", 0))
+    if not ENABLED or not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
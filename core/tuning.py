@@ -0,0 +1,125 @@
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.forecast import make_model, observed_xy
+
+TUNING_COLUMNS = ["country", "unit", "method", "params", "cv_mae", "folds"]
+
+# Candidate hyperparameters per method, ordered from the simplest model to the
+# most flexible one: on a tie the simpler candidate wins. The series are short
+# (a few dozen yearly points), so the grids stay small and shallow.
+PARAM_GRIDS = {
+    "Decision Tree": {"max_depth": [2, 3, None], "min_samples_leaf": [1, 2]},
+    "Random Forest": {"n_estimators": [10, 30], "max_depth": [2, None], "min_samples_leaf": [1, 2]},
+    "XGBoost": {"max_depth": [1, 2, 3], "learning_rate": [0.1, 0.3]},
+}
+TUNED_METHODS = list(PARAM_GRIDS)
+
+CV_FOLDS = 3 # Validation points per series (the last observed years)
+MIN_TRAIN = 4 # Observations before the first validation point (at least 2, for the inner early-stopping split)
+XGB_MAX_ESTIMATORS = 200 # Upper bound on boosting rounds; early stopping picks the number
+XGB_EARLY_STOPPING = 10 # Rounds without improvement on the validation fold before stopping
+
+
+# ---------------- Time-series cross-validation ----------------
+# Expanding-window, one-step-ahead folds: the model is fitted on the years
+# before each of the last CV_FOLDS observations and scored on that observation,
+# the way the app forecasts from the full history. Candidates are ranked by
+# their mean absolute error over the folds.
+
+# [(train slice, validation slice)] over n observations
+def time_series_folds(n, folds=CV_FOLDS, min_train=MIN_TRAIN):
+    return [(slice(0, t), slice(t, t + 1)) for t in range(max(min_train, n - folds), n)]
+
+
+def param_candidates(grid):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+# Boosting rounds are not searched: in each fold, early stopping picks them on
+# the last training point (an inner split, never the scored point), the model
+# is refitted on the whole training slice with that many rounds and scored.
+# The candidate keeps the median number of rounds over the folds.
+def _score(method, candidate, X, y, folds):
+    errors, rounds = [], []
+    for train, valid in folds:
+        X_train, y_train = X[train], y[train]
+        if method == "XGBoost":
+            stopper = make_model(method, n_jobs=1, params={**candidate, "n_estimators": XGB_MAX_ESTIMATORS,
+                                                           "early_stopping_rounds": XGB_EARLY_STOPPING})
+            stopper.fit(X_train[:-1], y_train[:-1], eval_set=[(X_train[-1:], y_train[-1:])], verbose=False)
+            rounds.append(stopper.best_iteration + 1)
+            model = make_model(method, n_jobs=1, params={**candidate, "n_estimators": rounds[-1]})
+        else:
+            model = make_model(method, n_jobs=1, params=candidate)
+        model.fit(X_train, y_train)
+        errors.append(float(np.abs(model.predict(X[valid]) - y[valid]).mean()))
+    params = dict(candidate)
+    if rounds:
+        params["n_estimators"] = int(np.median(rounds))
+    return float(np.mean(errors)), params
+
+
+# Best (params, cv_mae, folds) of one method on one series, or None when the
+# series is too short to validate on
+def tune_series(method, X, y, folds=CV_FOLDS, min_train=MIN_TRAIN):
+    splits = time_series_folds(len(y), folds, min_train)
+    if not splits:
+        return None
+    best = None
+    for candidate in param_candidates(PARAM_GRIDS[method]):
+        mae, params = _score(method, candidate, X, y, splits)
+        if best is None or mae < best[1]:
+            best = (params, mae)
+    return best[0], best[1], len(splits)
+
+
+# ---------------- Parallel search ----------------
+# One task per (unit, country): every method's grid on that series. Runs in a worker process.
+def _tune_task(task):
+    unit, country, years, values, methods, folds, min_train = task
+    X, y = observed_xy(years, values)
+    rows = []
+    for method in methods:
+        result = tune_series(method, X, y, folds, min_train)
+        if result is not None:
+            params, mae, n = result
+            rows.append((country, unit, method, json.dumps(params, sort_keys=True), mae, n))
+    return rows
+
+
+# panels: {unit label: frame with a Country column followed by year columns}.
+# Returns one row per (country, unit, method) with the chosen hyperparameters
+# (JSON) and their cross-validated MAE (TUNING_COLUMNS).
+def tune(panels, methods=TUNED_METHODS, folds=CV_FOLDS, min_train=MIN_TRAIN, workers=None):
+    methods = [m for m in methods if m in PARAM_GRIDS]
+    tasks = []
+    for unit, df in panels.items():
+        year_cols = list(df.columns[1:])
+        years = np.array([int(y) for y in year_cols])
+        values = df[year_cols].to_numpy(dtype=float)
+        for country, row in zip(df["Country"], values):
+            tasks.append((unit, country, years, row, methods, folds, min_train))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        rows = [row for task in tasks for row in _tune_task(task)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_tune_task, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+            rows = [row for task_rows in results for row in task_rows]
+    return pd.DataFrame(rows, columns=TUNING_COLUMNS)
+
+
+# {(country, unit, method): params} out of a tuning table
+def tuned_params(table):
+    if table is None or table.empty:
+        return {}
+    return {(c, u, m): json.loads(p) for c, u, m, p in
+            zip(table["country"], table["unit"], table["method"], table["params"])}
@@ -0,0 +1,175 @@
+import functools
+import os
+import threading
+
+import numpy as np
+
+from core.explain import get_explanation_service
+from core.figures import choropleth_figure, get_figure, trend_figure
+from core.forecast import MAX_HORIZON, METHODS, TREE_METHODS, fit_model, forecast_series, load_forecast_table, model_params, observed_xy
+from core.model_cache import get_model_cache, model_cache_key
+from core.panel import UNIT_MEASURES
+from core.pipeline import best_model_map, ensure_risk_table, ensure_simulated_risk, tuned_params_map
+from core.scheduler import Scheduler
+
+ENABLED = os.environ.get("SINGOFIN_WARMUP", "1").lower() in ("1", "true", "yes", "on")
+WORKERS = int(os.environ.get("SINGOFIN_WARMUP_WORKERS", 1))
+POPULAR_COUNTRIES = int(os.environ.get("SINGOFIN_WARMUP_POPULAR", 10))
+WINDOW_SIZE = 5 # Default Moving Average window of the prediction page
+FORECAST_YEARS = 3 # Default horizon of the prediction page (ranks its default method)
+
+# Priorities, most wanted first
+PLAN, RISK, MAPS, POPULAR, SIMULATION, EXPLAIN, REST = range(7)
+
+
+# ---------------- Background warm-up ----------------
+# Once a data version is loaded, the server fills the caches the pages read
+# from, in the order users tend to need them, on the scheduler of
+# core/scheduler.py (one low-priority thread by default, paused during page
+# and fragment reruns):
+#   1. risk tables                     risk_<measure> artifacts (analysis page)
+#   2. dashboard maps                  every year and unit, with the ISO mapping (figure cache)
+#   3. popular countries               trend figures and forecasts of every method, best one first
+#   4. simulations                     simulation_<measure>_<h>y artifacts (prediction page)
+#   5. SHAP of popular countries       when their default method is a tree model
+#   6. every other country's forecasts
+# Forecasts go to the model cache under the key the prediction page uses, and
+# are skipped when the precomputed forecast table already covers them. Pages
+# never wait for the warm-up: whatever is not warm yet is computed live as
+# before. A new data version cancels what is left of the previous one.
+# The plan itself is built by the first task, on the warm-up thread, so no
+# rerun reads the artifacts it needs. Warm-up fits use one core (n_jobs=1)
+# and its SHAP explanations run on the warm-up thread, not on the pool that
+# serves the pages' requests.
+# SINGOFIN_WARMUP=0 turns it off (e.g. next to `python -m core precompute`).
+
+_scheduler = Scheduler(workers=WORKERS, name="warmup")
+_lock = threading.Lock()
+_version = None
+
+
+def get_scheduler():
+    return _scheduler
+
+
+# For fragment functions (under @st.fragment): a fragment rerun pauses the
+# warm-up like a full rerun does (app.py)
+def pauses_warmup(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _scheduler.interactive():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+# The prediction page's default country first, then the largest latest USD
+# positions (in absolute value), the ones most looked at
+def popular_countries(data, n=POPULAR_COUNTRIES):
+    countries = sorted(data.panel.countries_with_data("usd"))
+    if not countries or n <= 0:
+        return []
+    latest = data.panel.year_slice(data.year_cols[-1], "usd").abs().dropna()
+    ranked = [countries[0]] + [c for c in latest.sort_values(ascending=False).index if c != countries[0]]
+    return ranked[:n]
+
+
+# (country, unit, method) already in the forecast table, for the longest horizon
+def _stored_forecasts(version):
+    table = load_forecast_table(version)
+    if table is None:
+        return set()
+    table = table[table["window"].isin([0, WINDOW_SIZE])]
+    counts = table.groupby(["country", "unit", "method"]).size()
+    return set(counts[counts >= MAX_HORIZON].index)
+
+
+def _warm_forecast(data, country, unit, method, tuned):
+    values = data.panel.series(country, UNIT_MEASURES[unit]).to_numpy()
+    years = np.array([int(y) for y in data.panel.years])
+    key = model_cache_key(country, unit, method, model_params(method, WINDOW_SIZE, tuned), data.version)
+    get_model_cache().get_or_compute(
+        key, lambda: forecast_series(years, values, method, MAX_HORIZON, WINDOW_SIZE, n_jobs=1, params=tuned))
+
+
+# Same key and model as the prediction page's SHAP panel
+def _warm_explanation(data, country, unit, method, tuned):
+    values = data.panel.series(country, UNIT_MEASURES[unit]).to_numpy()
+    X, y = observed_xy(np.array([int(y) for y in data.panel.years]), values)
+    if len(y) < 2:
+        return
+    key = model_cache_key(country, unit, method, model_params(method, WINDOW_SIZE, tuned), data.version)
+    cached = get_model_cache().get(key)
+    model = cached.model if cached is not None else None
+    get_model = lambda: model if model is not None else fit_model(method, X, y, n_jobs=1, params=tuned)
+    get_explanation_service().precompute(key, get_model, X)
+
+
+# [(priority, name, fn)] for one data snapshot
+def plan(data):
+    panel, version = data.panel, data.version
+    tuned = tuned_params_map(data)
+    best = best_model_map(data, FORECAST_YEARS)
+    stored = _stored_forecasts(version)
+    popular = popular_countries(data)
+    measures = sorted(set(UNIT_MEASURES.values()))
+    tasks = []
+
+    for measure in measures:
+        tasks.append((RISK, f"risk {measure}", lambda m=measure: ensure_risk_table(data, m)))
+
+    for unit, measure in UNIT_MEASURES.items():
+        for year in data.year_cols:
+            tasks.append((MAPS, f"map {year} {measure}", lambda y=year, m=measure: get_figure(
+                version, "map", (y, m), lambda: choropleth_figure(panel.year_slice(y, m).dropna(), data.iso_codes))))
+
+    for measure in measures:
+        for h in range(1, MAX_HORIZON + 1):
+            tasks.append((SIMULATION, f"simulation {measure} {h}y", lambda m=measure, h=h: ensure_simulated_risk(data, m, h)))
+
+    for unit, measure in UNIT_MEASURES.items():
+        available = set(panel.countries_with_data(measure))
+        rest = sorted(available - set(popular))
+        for country in [c for c in popular if c in available] + rest:
+            priority = POPULAR if country in popular else REST
+            if priority == POPULAR:
+                tasks.append((POPULAR, f"trend {country} {measure}", lambda c=country, u=unit, m=measure: get_figure(
+                    version, "trend", (c, m), lambda: trend_figure(panel.series(c, m), f"{c} - NFA Trend ({u})"))))
+            default = best.get((country, unit), METHODS[0])
+            for method in [default] + [m for m in METHODS if m != default]:
+                params = tuned.get((country, unit, method))
+                if (country, unit, method) not in stored:
+                    tasks.append((priority, f"forecast {country} {unit} {method}",
+                                  lambda c=country, u=unit, m=method, p=params: _warm_forecast(data, c, u, m, p)))
+            if priority == POPULAR and default in TREE_METHODS:
+                tasks.append((EXPLAIN, f"shap {country} {unit} {default}",
+                              lambda c=country, u=unit, m=default, p=tuned.get((country, unit, default)):
+                              _warm_explanation(data, c, u, m, p)))
+    return tasks
+
+
+# Queues the warm-up of this snapshot unless it is already queued; called on
+# every rerun, so it returns at once for a known version. Only the planning
+# task is queued here; it queues the rest from the warm-up thread.
+def start_warmup(data):
+    global _version
+    if not ENABLED or data is None:
+        return
+    with _lock:
+        if data.version == _version:
+            return
+        _scheduler.cancel()
+        _version = data.version
+        _scheduler.submit(f"plan {data.version}", lambda: _submit_plan(data), priority=PLAN, group=data.version)
+
+
+def _submit_plan(data):
+    tasks = plan(data)
+    with _lock:
+        if data.version != _version:
+            return # A newer version took over while planning
+        for priority, name, fn in tasks:
+            _scheduler.submit(name, fn, priority=priority, group=data.version)
+
+
+def warmup_progress():
+    return dict(_scheduler.progress(), version=_version, enabled=ENABLED)
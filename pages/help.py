@@ -2,6 +2,11 @@ import streamlit as st
 
 # ---------- Page Config ----------
 st.set_page_config(layout="wide")
+
+from core.figures import get_figure_cache
+from core.store import get_store
+from core.warmup import warmup_progress
+
 st.sidebar.markdown("# ❓ HELP")
 
 # ---------- Custom Styles ----------
@@ -39,6 +44,7 @@ with st.expander("📊 Analysis"):
   - 🧭 **Volatility-based risk level gauge**
   - 📉 **Year-over-year change chart**
   - 📊 **Value at Risk (VaR), Exposure, and Loss Probability**
+- 🌐 **Risk Screener**: rank and filter all countries by any risk metric or risk level.
 """)
 
 with st.expander("📄 Prediction"):
@@ -55,7 +61,7 @@ with st.expander("📄 Prediction"):
     - ⏩ **Years to forecast**
 - Results:
     - 📊 **NFA prediction line chart**
-    - ⚠️ **Volatility & risk forecast**
+    - ⚠️ **Volatility & risk forecast** (Monte Carlo simulation of 20,000 paths per country)
     - 🤖 **SHAP Summary Plot** (for model interpretability on tree-based models)
 """)
 
@@ -68,6 +74,39 @@ with st.expander("⚙️ Data & Sources"):
 - Missing data is automatically filled using average-based imputation (front and back)
 """)
 
+    # Reload the shared data for every session (e.g. after replacing a file in ./data)
+    if st.button("🔄 Reload data"):
+        data = get_store().reload()
+        if data is not None:
+            st.success(f"Data reloaded (version {data.version}).")
+        else:
+            st.error(f"Reload failed: {get_store().error}")
+            if get_store().get() is not None:
+                st.caption(f"Still serving version {get_store().get().version}.")
+
+with st.expander("🧠 Memory Usage"):
+    # Bytes held by the shared data of this server process (one copy for all sessions)
+    data = get_store().get()
+    if data is not None:
+        usage = data.memory_usage()
+        st.dataframe(usage.assign(kb=usage["bytes"] / 1024).drop(columns="bytes"), hide_index=True, use_container_width=True,
+                     column_config={"kb": st.column_config.NumberColumn("KB", format="%.1f")})
+        st.caption(f"Total: {usage['bytes'].sum() / 1024:,.1f} KB, values stored as {data.panel.cube.dtype}.")
+    figure_stats = get_figure_cache().stats()
+    st.caption(f"Dashboard figure cache: {figure_stats['entries']} figures, "
+               f"{figure_stats['hits']} hits / {figure_stats['misses']} misses")
+
+    # Caches filled in the background after startup (core/warmup.py)
+    progress = warmup_progress()
+    if not progress["enabled"]:
+        st.caption("Background warm-up: off (SINGOFIN_WARMUP=0).")
+    elif progress["total"]:
+        st.progress(progress["finished"] / progress["total"],
+                    text=f"Background warm-up: {progress['finished']}/{progress['total']} tasks"
+                         + (f", {progress['failed']} failed" if progress["failed"] else ""))
+        if progress["running"]:
+            st.caption("Running: " + "; ".join(progress["running"]))
+
 # ---------- Feedback Section ----------
 st.markdown("## 💬 Feedback")
 st.write("""
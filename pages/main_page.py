@@ -3,17 +3,13 @@ import streamlit as st
 # ---------- Must be first Streamlit command ----------
 st.set_page_config(layout="wide")
 
-import plotly.express as px
 import pandas as pd
-import pycountry
-import altair as alt
 
-# To have the three-letter code representing the country
-def get_iso_alpha(country_name):
-    try:
-        return pycountry.countries.lookup(country_name).alpha_3
-    except:
-        return None
+from core.figures import choropleth_figure, get_figure, trend_figure
+from core.panel import UNIT_MEASURES
+from core.store import get_data
+from core.telemetry import span
+from core.warmup import pauses_warmup
 
 # using suffixes like "T" (trillion), "B" (billion), "M" (million), and "K" (thousand)
 def format_number(n):
@@ -37,28 +33,24 @@ with open("./style/style.css") as f:
 # ---------- Header ----------
 st.markdown('<div class="header">.: SINGO FINANCIAL RISK APP :.</div>', unsafe_allow_html=True)
 
-# ---------- Load Data from Session State ----------
-df_nfa = st.session_state.df_nfa # Domestic currency data
-df_fx = st.session_state.df_fx  # Exchange rate data
-df_usd = st.session_state.df_usd # Converted to USD
-year_cols = st.session_state.year_cols # List of years
+# ---------- Load Data from the Shared Store ----------
+data = get_data()
+if data is None:
+    st.error("⚠️ Data not loaded. Please check the files in ./data and reload the app.")
+    st.stop()
+
+panel = data.panel # Indexed (country, year, measure) store
+year_cols = data.year_cols # List of years
 
 # ---------- Sidebar Selections ----------
 st.sidebar.markdown("# DASHBOARD 🏠")
 year_list = year_cols
 selected_year = st.sidebar.selectbox("Select year", year_list, index=len(year_list)-1)
 unit_option = st.sidebar.radio("Unit", ["Domestic Currency", "USD"])
-unit_suffix = "_local" if unit_option == "Domestic Currency" else "_usd"
-selected_col = str(selected_year) + unit_suffix
-
-# ---------- Merge and Prepare Main Data ----------
-merged_df = pd.merge(df_nfa, df_fx, on="Country", suffixes=("_local", "_fx"))
-for year in year_cols:
-    usd_col = f"{year}_usd"
-    if usd_col not in merged_df.columns:
-        merged_df[usd_col] = merged_df[f"{year}_local"] / merged_df[f"{year}_fx"]
+measure = UNIT_MEASURES[unit_option]
 
-merged_df["iso_alpha"] = merged_df["Country"].apply(get_iso_alpha)
+# ---------- Slice the Panel for the Selected Year and Unit ----------
+year_values = panel.year_slice(selected_year, measure).dropna()
 
 
 
@@ -68,60 +60,52 @@ col = st.columns((2, 4.5, 2), gap='small')
 
 # ---------- World Map + Trends ----------
 with col[1]:
-    map_df = merged_df[["Country", "iso_alpha", selected_col]].dropna()
-    map_df.rename(columns={selected_col: "Amount"}, inplace=True)
-
-    st.write(f"#### 🌍 World Map - Net Foreign Assets (NFA) by Country ({selected_year}) [{unit_option}]")
-
-    # Plotly choropleth map (World map)
-    fig = px.choropleth(
-        map_df,
-        locations="iso_alpha",
-        color="Amount",
-        hover_name="Country",
-        color_continuous_scale=px.colors.sequential.Plasma,
-    )
-    fig.update_layout(geo=dict(bgcolor="rgba(0,0,0,0)"), margin=dict(l=0, r=0, t=0, b=0))
-    st.plotly_chart(fig, use_container_width=True)
+    with span("dashboard.map"):
+        st.write(f"#### 🌍 World Map - Net Foreign Assets (NFA) by Country ({selected_year}) [{unit_option}]")
+
+        # Plotly choropleth map (World map), built once per year, unit and data
+        # version (see core/figures.py); country codes come from core/countries.py
+        fig = get_figure(data.version, "map", (selected_year, measure),
+                         lambda: choropleth_figure(year_values, data.iso_codes))
+        st.plotly_chart(fig, use_container_width=True)
 
 # ---------- Top Countries ----------
 with col[2]:
     st.markdown('#### Top Countries')
-    df_top_countries = merged_df[["Country", selected_col]].dropna().sort_values(by=selected_col, ascending=False).reset_index(drop=True)
-    df_top_countries.rename(columns={"Country": "country", selected_col: "nfa"}, inplace=True)
-    df_top_countries = df_top_countries.head(20)
-
-    st.dataframe(
-        df_top_countries,
-        column_order=("country", "nfa"),
-        hide_index=True,
-        column_config={
-            "country": st.column_config.TextColumn("Country"),
-            "nfa": st.column_config.ProgressColumn(
-                f"NFA ({unit_option})",
-                format="%f",
-                min_value=0,
-                max_value=max(df_top_countries["nfa"]),
-            )
-        }
-    )
+    with span("dashboard.top_countries"):
+        top_values = year_values.nlargest(20)
+        df_top_countries = pd.DataFrame({"country": top_values.index, "nfa": top_values.to_numpy()})
+
+        st.dataframe(
+            df_top_countries,
+            column_order=("country", "nfa"),
+            hide_index=True,
+            column_config={
+                "country": st.column_config.TextColumn("Country"),
+                "nfa": st.column_config.ProgressColumn(
+                    f"NFA ({unit_option})",
+                    format="%f",
+                    min_value=0,
+                    max_value=max(df_top_countries["nfa"]),
+                )
+            }
+        )
 
 # ---------- Gains/Losses ----------
 with col[0]:
     st.markdown('#### Gains/Losses')
     prev_year = str(int(selected_year) - 1)
 
-    # Check if the previous year exists in the DataFrame
-    if prev_year in year_list:
-        prev_col = prev_year + unit_suffix
-        merged_df["NFA_change"] = merged_df[selected_col] - merged_df[prev_col]
-        df_change_sorted = merged_df[["Country", selected_col, "NFA_change"]].dropna().sort_values("NFA_change", ascending=False)
-        
-        top_country = df_change_sorted.iloc[0]
-        st.metric(label=top_country["Country"], value=format_number(top_country[selected_col]), delta=format_number(top_country['NFA_change']))
-
-        bottom_country = df_change_sorted.iloc[-1]
-        st.metric(label=bottom_country["Country"], value=format_number(bottom_country[selected_col]), delta=format_number(bottom_country['NFA_change']))
+    # Check if the previous year exists in the panel
+    if panel.has_year(prev_year):
+        nfa_change = (panel.year_slice(selected_year, measure) - panel.year_slice(prev_year, measure)).dropna()
+        df_change_sorted = nfa_change.sort_values(ascending=False)
+
+        top_country = df_change_sorted.index[0]
+        st.metric(label=top_country, value=format_number(panel.value(top_country, selected_year, measure)), delta=format_number(df_change_sorted.iloc[0]))
+
+        bottom_country = df_change_sorted.index[-1]
+        st.metric(label=bottom_country, value=format_number(panel.value(bottom_country, selected_year, measure)), delta=format_number(df_change_sorted.iloc[-1]))
     else:
         st.metric(label="No Data", value="-", delta="-")
         st.metric(label="No Data", value="-", delta="-")
@@ -133,34 +117,37 @@ with col[0]:
         - :orange[**Top Countries**]: Highest NFA in {selected_year}
         - :orange[**Units**]: {unit_option}
         ''')
+        not_on_map = sorted(c for c in year_values.index if data.iso_codes.get(c) is None)
+        if not_on_map:
+            st.caption("Not shown on the map (no ISO code): " + "; ".join(not_on_map))
 
 # ---------- lign ----------
 st.markdown('<div class="h"></div>', unsafe_allow_html=True)
 
 # ---------- Country Trend Part----------
-coll = st.columns((1.5, 4.5), gap='medium')
-
-with coll[0]:
-    selected_country = st.selectbox("Select a country", sorted(merged_df["Country"].unique()))
-    selected_row = merged_df[merged_df["Country"] == selected_country]
-    selected_value = selected_row[selected_col].values[0] if not selected_row.empty else "N/A"
-    st.write(f"**{selected_country} - {selected_year} Amount ({unit_option}):** {selected_value:,}")
-
-with coll[1]:
-    if not selected_row.empty:
-        trend_cols = [y + unit_suffix for y in year_cols]
-        trend_data = selected_row[trend_cols].T
-        trend_data.columns = [selected_country]
-        trend_data.index = year_cols
-        trend_data.index.name = "Year"
-        trend_data = trend_data.reset_index()
-
-        st.write(f"### 📈 NFA Trend for {selected_country} ({unit_option})")
-        trend_fig = px.line(trend_data, x="Year", y=selected_country, markers=True,
-                            title=f"{selected_country} - NFA Trend ({unit_option})",
-                            labels={selected_country: "Net Foreign Assets", "Year": "Year"})
-        trend_fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", font_color="white")
-        st.plotly_chart(trend_fig, use_container_width=True)
+# A fragment: picking a country reruns only this part, not the map and the
+# tables above. Its inputs are the arguments (set by the sidebar on a full rerun).
+@st.fragment
+@pauses_warmup
+def country_trend(version, panel, selected_year, measure, unit_option):
+    coll = st.columns((1.5, 4.5), gap='medium')
+
+    with coll[0]:
+        selected_country = st.selectbox("Select a country", sorted(panel.countries_with_data(measure)))
+        selected_value = panel.value(selected_country, selected_year, measure) if selected_country is not None else "N/A"
+        st.write(f"**{selected_country} - {selected_year} Amount ({unit_option}):** {selected_value:,}")
+
+    with coll[1]:
+        if selected_country is not None:
+            with span("dashboard.trend"):
+                st.write(f"### 📈 NFA Trend for {selected_country} ({unit_option})")
+                # Built once per country, unit and data version from a view of the panel cube
+                trend_fig = get_figure(version, "trend", (selected_country, measure),
+                                       lambda: trend_figure(panel.series(selected_country, measure),
+                                                            f"{selected_country} - NFA Trend ({unit_option})"))
+                st.plotly_chart(trend_fig, use_container_width=True)
+
+country_trend(data.version, panel, selected_year, measure, unit_option)
 
 # ---------- Footer ----------
 st.markdown('<div class="h1"></div>', unsafe_allow_html=True)
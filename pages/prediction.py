@@ -1,22 +1,30 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import pycountry
 import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.tree import DecisionTreeRegressor
-import xgboost as xgb
-import shap
-import matplotlib.pyplot as plt
-import streamlit.components.v1 as components
 import warnings
 
+from core.forecast import (
+    MAX_HORIZON, METHODS, TREE_METHODS, ForecastResult, fit_model, forecast_series,
+    load_forecast_table, lookup_forecast, model_params, observed_xy,
+)
+from core.backtest import pooled_accuracy
+from core.cache import artifact_stamp
+from core.closed_form import CI_LEVEL
+from core.explain import get_explanation_service
+from core.pipeline import (
+    HIGH_RISK_THRESHOLD, SIMULATION_PATHS, backtest_summary, best_model_map, simulated_risk,
+    simulated_risk_stamp, tuned_params_map,
+)
+from core.model_cache import get_model_cache, model_cache_key
+from core.panel import UNIT_MEASURES
+from core.store import get_data
+from core.telemetry import span
+from core.warmup import pauses_warmup
+
 # ---------- Setup ----------
 st.set_page_config(layout="wide")
 warnings.filterwarnings("ignore")
-shap.initjs()
 
 # ---------- Custom CSS ----------
 with open("./style/style.css") as f:
@@ -26,119 +34,194 @@ with open("./style/style.css") as f:
 st.markdown('<div class="header">.: NFA FORECAST & RISK :.</div>', unsafe_allow_html=True)
 
 # ---------- Load Data ----------
-if "df_nfa" not in st.session_state:
+data = get_data()
+if data is None:
     st.warning("Data not loaded. Please return to the Home page to initialize.")
     st.stop()
 
-df_nfa = st.session_state.df_nfa
-df_fx = st.session_state.df_fx
-df_usd = st.session_state.df_usd
-year_cols = st.session_state.year_cols
+year_cols = data.year_cols
+panel = data.panel
+
+# ---------- Backtest (python -m core precompute), once per data version ----------
+# The artifact stamps are part of the keys: artifacts written after this page
+# first ran replace the empty results cached without them
+@st.cache_data(show_spinner=False)
+def cached_backtest(version, stamp):
+    return backtest_summary(data)
+
+# Best method per (country, unit), ranked over the same horizons as the Backtest Accuracy table
+@st.cache_data(show_spinner=False)
+def cached_best_models(version, stamp, horizon):
+    return best_model_map(data, horizon)
+
+backtest_stamp = artifact_stamp("backtest", data.version)
+backtest_table = cached_backtest(data.version, backtest_stamp)
+
+# Tuned hyperparameters per (country, unit, method); library defaults where missing
+@st.cache_data(show_spinner=False)
+def cached_tuning(version, stamp):
+    return tuned_params_map(data)
+
+tuned_by_series = cached_tuning(data.version, artifact_stamp("tuning", data.version))
 
 # ---------- Sidebar ----------
 st.sidebar.markdown("# PREDICTIONS 🔮")
-country_list = sorted(df_usd['Country'].unique())
+country_list = sorted(panel.countries_with_data("usd"))
 selected_country = st.sidebar.selectbox("Select Country", country_list)
 unit_option = st.sidebar.radio("Currency", ["Domestic Currency", "USD"])
-unit_suffix = "_local" if unit_option == "Domestic Currency" else "_usd"
-prediction_method = st.sidebar.selectbox("Prediction Model", [
-    "Decision Tree", "Random Forest", "XGBoost", "Linear Regression", "Moving Average"
-])
+measure = UNIT_MEASURES[unit_option]
+forecast_years = st.sidebar.slider("Years to Forecast", 1, MAX_HORIZON, 3)
+# Defaults to the method with the lowest walk-forward error for this country
+# over the next 1 to forecast_years years
+best_by_country = cached_best_models(data.version, backtest_stamp, forecast_years)
+best_method = best_by_country.get((selected_country, unit_option))
+prediction_method = st.sidebar.selectbox(
+    "Prediction Model", METHODS, index=METHODS.index(best_method) if best_method in METHODS else 0,
+    format_func=lambda m: f"{m} ★" if m == best_method else m,
+    help=f"★ = lowest error in the walk-forward backtest for this country, 1-{forecast_years} years ahead"
+    if best_method else None,
+)
 window_size = st.sidebar.slider("Moving Average Window size", 2, 10, 5)
-forecast_years = st.sidebar.slider("Years to Forecast", 1, 5, 3)
 
 # ---------- Prepare Data ----------
-df_data = df_usd if unit_suffix == "_local" else df_usd
-selected_cols = [str(y) for y in year_cols]
-country_data = df_data[df_data["Country"] == selected_country]
-values = country_data[selected_cols].values.flatten()
-years = np.array([int(y) for y in selected_cols])
-valid_mask = ~np.isnan(values)
-X = years[valid_mask].reshape(-1, 1)
-y = values[valid_mask]
+tuned = tuned_by_series.get((selected_country, unit_option, prediction_method))
+values = panel.series(selected_country, measure).to_numpy()
+years = np.array([int(y) for y in panel.years])
 
 # ---------- Forecasting ----------
-forecast = []
-future_years = []
-model = None
-
-if prediction_method == "Moving Average":
-    if len(y) >= window_size:
-        y_series = list(y)
-        for _ in range(forecast_years):
-            ma = np.mean(y_series[-window_size:])
-            y_series.append(ma)
-            forecast.append(ma)
-        future_years = np.arange(X.max() + 1, X.max() + 1 + forecast_years)
-        all_years = list(X.flatten()) + list(future_years)
-        all_values = list(y) + forecast
-    else:
-        st.warning(f"Not enough data for Moving Average (need at least {window_size} valid years).")
-        all_years, all_values = list(X.flatten()), list(y)
+# Read from the precomputed forecast table when it covers this selection,
+# then from the shared model cache, and only otherwise fit the model live
+@st.cache_data(show_spinner=False)
+def cached_forecast_table(version, stamp):
+    return load_forecast_table(version)
+
+forecast_table = cached_forecast_table(data.version, artifact_stamp("forecasts", data.version))
+stored = None
+if forecast_table is not None:
+    stored = lookup_forecast(forecast_table, selected_country, unit_option, prediction_method, forecast_years, window_size)
+
+cache_key = model_cache_key(selected_country, unit_option, prediction_method,
+                            model_params(prediction_method, window_size, tuned), data.version)
+if stored is not None:
+    X, y = observed_xy(years, values)
+    result = ForecastResult(X, y, *stored)
 else:
-    if len(y) > 1:
-        if prediction_method == "Linear Regression":
-            model = LinearRegression()
-        elif prediction_method == "Decision Tree":
-            model = DecisionTreeRegressor()
-        elif prediction_method == "Random Forest":
-            model = RandomForestRegressor()
-        elif prediction_method == "XGBoost":
-            model = xgb.XGBRegressor()
-
-        model.fit(X, y)
-        future_years = np.arange(X.max() + 1, X.max() + 1 + forecast_years)
-        forecast = model.predict(future_years.reshape(-1, 1))
-        all_years = list(X.flatten()) + list(future_years)
-        all_values = list(y) + list(forecast)
-    else:
-        st.warning("Not enough data to train the model.")
-        all_years, all_values = list(X.flatten()), list(y)
-
-# ---------- SHAP Summary Plot ----------
-if prediction_method in ["Decision Tree", "Random Forest", "XGBoost"] and model is not None:
-    st.markdown("### 🤖 SHAP Explanation (XAI)")
-
-    try:
-        # Create SHAP explainer and compute SHAP values
-        explainer = shap.Explainer(model, X)
-        shap_values = explainer(X)
-
-        # Assign a meaningful name to the feature
-        feature_names = ["Year"]   
-        shap_values.feature_names = feature_names
-
-        # SHAP Summary Plot
-        st.write("#### SHAP Summary Plot (Feature Importance)")
-        fig, ax = plt.subplots()
-        shap.plots.beeswarm(shap_values, show=False)
-        st.pyplot(fig)
-
-    except Exception as e:
-        st.error(f"Error generating SHAP explanation: {e}")
+    # Fit once for the longest horizon; the horizon slider only cuts the result
+    model_cache = get_model_cache()
+    with span(f"prediction.forecast.{prediction_method}"):
+        result = model_cache.get_or_compute(
+            cache_key, lambda: forecast_series(years, values, prediction_method, MAX_HORIZON, window_size, params=tuned)
+        ).head(forecast_years)
+    if result.message:
+        st.warning(result.message)
+
+X, y, model = result.X, result.y, result.model
+all_years, all_values = result.all_years, result.all_values
 
 # ---------- Volatility & Risk ----------
 volatility = np.std(y) / np.mean(y) if len(y) > 1 and np.mean(y) != 0 else np.nan
 future_vol = np.std(all_values) / np.mean(all_values) if len(all_values) > 1 and np.mean(all_values) != 0 else np.nan
-threshold = 0.03
-prob_high_risk = np.mean(np.random.normal(future_vol, 0.01, 1000) > threshold) if not np.isnan(future_vol) else np.nan
+threshold = HIGH_RISK_THRESHOLD
+
+# Monte Carlo simulation of every country's future paths (bootstrapped YoY
+# changes), once per data version, unit and horizon; this page reads its row.
+# Precomputed by `python -m core precompute` when available.
+@st.cache_data(show_spinner="Simulating risk paths...")
+def get_simulated_risk(version, measure, horizon, stamp):
+    return simulated_risk(data, measure, horizon)
+
+with span("prediction.simulate"):
+    simulated = get_simulated_risk(data.version, measure, forecast_years,
+                                   simulated_risk_stamp(data, measure, forecast_years))
+simulated_row = simulated[simulated["Country"] == selected_country]
+if not simulated_row.empty:
+    sim = simulated_row.iloc[0]
+    prob_high_risk, prob_high_risk_se = sim["prob_high_risk"] / 100, sim["prob_high_risk_se"] / 100
+    sim_loss_probability, sim_var_95 = sim["loss_probability"], sim["var_95"]
+else:
+    prob_high_risk = prob_high_risk_se = sim_loss_probability = sim_var_95 = np.nan
 
 # ---------- Layout ----------
 col1, col2 = st.columns((2, 1), gap='small')
 
 with col1:
     st.markdown(f"### 🔮 Forecasted NFA ({prediction_method})")
-    df_pred = pd.DataFrame({"Year": all_years, "NFA": all_values})
-    fig = px.line(df_pred, x="Year", y="NFA", markers=True,
-                  title=f"Forecasted NFA - {selected_country} ({prediction_method})")
-    st.plotly_chart(fig, use_container_width=True)
+    with span("prediction.chart"):
+        df_pred = pd.DataFrame({"Year": all_years, "NFA": all_values})
+        fig = px.line(df_pred, x="Year", y="NFA", markers=True,
+                      title=f"Forecasted NFA - {selected_country} ({prediction_method})")
+        # Residual-based interval of the closed-form methods (core/closed_form.py)
+        if result.lower is not None and len(result.forecast):
+            fig.add_scatter(x=result.future_years, y=result.upper, mode="lines", line_width=0,
+                            showlegend=False, hoverinfo="skip")
+            fig.add_scatter(x=result.future_years, y=result.lower, mode="lines", line_width=0, fill="tonexty",
+                            fillcolor="rgba(99, 110, 250, 0.2)", name=f"{CI_LEVEL:.0%} interval")
+        st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     st.markdown("### 📉 Volatility Forecast")
     st.metric("Current Volatility", f"{volatility*100:.2f}%" if not np.isnan(volatility) else "N/A")
     st.metric("Future Volatility", f"{future_vol*100:.2f}%" if not np.isnan(future_vol) else "N/A")
-    st.metric("Probability High Risk", f"{prob_high_risk*100:.1f}%" if not np.isnan(prob_high_risk) else "N/A")
+    st.metric("Probability High Risk", f"{prob_high_risk*100:.1f}%" if not np.isnan(prob_high_risk) else "N/A",
+              help=f"Share of {SIMULATION_PATHS:,} simulated paths whose volatility exceeds {threshold:.0%} "
+                   f"(± {prob_high_risk_se*100:.2f}% standard error)" if not np.isnan(prob_high_risk) else None)
+    st.metric(f"Loss Probability ({forecast_years}y, simulated)", f"{sim_loss_probability:.1f}%" if not np.isnan(sim_loss_probability) else "N/A")
+    st.metric(f"Simulated VaR (5%, {forecast_years}y)", f"{sim_var_95:,.2f}" if not np.isnan(sim_var_95) else "N/A")
+
+
+# ---------- SHAP Summary Plot ----------
+# Opt-in: the explanation runs on a background worker and is cached per fitted
+# model, so the forecast above never waits for it
+if prediction_method in TREE_METHODS and len(y) > 1:
+    st.markdown("### 🤖 SHAP Explanation (XAI)")
 
+    if st.toggle("Explain this forecast with SHAP", key="shap_enabled"):
+        # A stored forecast has no fitted model attached; it is refit (same seed) on the worker
+        def get_model(model=model, method=prediction_method, X=X, y=y, params=tuned):
+            return model if model is not None else fit_model(method, X, y, params=params)
+
+        explanation_job = get_explanation_service().request(cache_key, get_model, X)
+
+        # Polls while the job runs; once it finishes, one full rerun redraws the panel without polling
+        started_done = explanation_job.done()
+
+        @st.fragment(run_every=None if started_done else 1.0)
+        @pauses_warmup
+        def shap_panel():
+            if not explanation_job.done():
+                st.info("⏳ Computing SHAP explanation in the background...")
+            elif not started_done:
+                st.rerun()
+            else:
+                try:
+                    explanation = explanation_job.result()
+                    st.write("#### SHAP Summary Plot (Feature Importance)")
+                    st.image(explanation.image)
+                except Exception as e:
+                    st.error(f"Error generating SHAP explanation: {e}")
+
+        shap_panel()
+
+# ---------- Backtest Accuracy ----------
+if backtest_table is not None:
+    with st.expander("📏 Backtest Accuracy (walk-forward)", expanded=False):
+        country_rows = backtest_table[(backtest_table["country"] == selected_country) & (backtest_table["unit"] == unit_option)]
+        accuracy = pooled_accuracy(country_rows, forecast_years).sort_values("mae", kind="stable")
+        if accuracy.empty:
+            st.info("Not enough history to backtest this country.")
+        else:
+            st.dataframe(
+                accuracy[["method", "n", "mae", "mape", "rmse"]], hide_index=True, use_container_width=True,
+                column_config={
+                    "method": st.column_config.TextColumn("Method"),
+                    "n": st.column_config.NumberColumn("Forecasts"),
+                    "mae": st.column_config.NumberColumn("MAE", format="%.2f"),
+                    "mape": st.column_config.NumberColumn("MAPE (%)", format="%.1f"),
+                    "rmse": st.column_config.NumberColumn("RMSE", format="%.2f"),
+                },
+            )
+            st.caption(f"Each method refitted on the history up to every past year and scored on the "
+                       f"following 1-{forecast_years} years.")
 
 # ---------- About ----------
 with st.expander("ℹ️ About this Forecast", expanded=False):
@@ -147,6 +230,12 @@ with st.expander("ℹ️ About this Forecast", expanded=False):
     - **Forecast Horizon**: {forecast_years} years  
     - {"Uses a simple rolling average of past values." if prediction_method == "Moving Average" else "Uses a supervised regression model to predict future values and explain them using SHAP."}
     """)
+    if tuned:
+        st.caption("Tuned hyperparameters (time-series cross-validation): "
+                   + ", ".join(f"{k}={v}" for k, v in sorted(tuned.items())))
+    cache_stats = get_model_cache().stats()
+    st.caption(f"Model cache: {cache_stats['entries']} models, {cache_stats['bytes'] / 1e6:.1f} MB, "
+               f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
 
 # ---------- Footer ----------
 st.markdown('<div class="h1"></div>', unsafe_allow_html=True)